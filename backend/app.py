@@ -1,8 +1,13 @@
 # app.py
 from flask import Flask
-from models import db
+from models import db, Session
 import config
 from routes import routes_blueprint
+import live_transcribe
+from live_transcribe import socketio
+import replicas
+import profiling
+import audio_cache
 from flask_migrate import Migrate
 from flask_apscheduler import APScheduler
 from datetime import datetime
@@ -11,9 +16,20 @@ def create_app():
     app = Flask(__name__)
     app.config["SQLALCHEMY_DATABASE_URI"] = config.DATABASE_URI
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50 MB
+    # Green workers run many requests at once; size the pool for them
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+    }
+    # Uploads stream through ffmpeg with constant memory, so this only
+    # bounds disk use and upload time
+    app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_MB * 1024 * 1024
+    app.config["SQLALCHEMY_BINDS"] = replicas.replica_binds()
 
     db.init_app(app)
+    replicas.init_app(app, db)
+    profiling.init_app(app)
 
     # Initialize Flask-Migrate
     Migrate(app, db)  # no need to store in a variable
@@ -36,6 +52,8 @@ def create_app():
                 s.transcription_expires_at = None
             if expired.count():
                 db.session.commit()
+            audio_cache.purge_expired()
+        live_transcribe.purge_stale()
 
     scheduler.init_app(app)
     scheduler.start()
@@ -43,6 +61,9 @@ def create_app():
 
     app.register_blueprint(routes_blueprint, url_prefix="/api")
 
+    # Socket.IO for live transcription (see live_transcribe.py)
+    socketio.init_app(app, max_http_buffer_size=10 * 1024 * 1024)
+
     return app
 
 # Create a global 'app' variable for 'flask run'
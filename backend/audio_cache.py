@@ -0,0 +1,111 @@
+# audio_cache.py
+"""
+Deduplicate transcription of identical audio.
+
+Uploads are fingerprinted by hashing the decoded PCM (16 kHz mono), so the
+same recording hashes the same even if it was re-encoded or re-wrapped on a
+retry. Transcripts are cached in the transcript_cache table per (audio,
+session) for the same 24 hours as Session.transcription_expires_at, purged
+with it, and deleted with the session; other sessions never see them.
+
+A retry usually arrives while the first transcription is still running, so
+callers hold in_flight(audio_hash, session_id) around the cache lookup and
+the Whisper call: the second request waits for the first and then finds its
+transcript.
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from green import original_subprocess, run_blocking
+from models import db, TranscriptCache
+
+READ_SIZE = 64 * 1024
+
+# _IN_FLIGHT[("<audio_hash>", 123)] = [lock, number of requests holding or waiting]
+_IN_FLIGHT = {}
+_in_flight_lock = threading.Lock()
+
+
+def fingerprint(audio_path):
+    """SHA-256 of the normalised audio; falls back to the file bytes."""
+    try:
+        return run_blocking(_pcm_sha256, audio_path)
+    except Exception as e:
+        print(f"Could not decode {audio_path} for fingerprinting, hashing bytes: {e}")
+        return run_blocking(_file_sha256, audio_path)
+
+
+def _pcm_sha256(audio_path):
+    sp = original_subprocess()
+    digest = hashlib.sha256()
+    proc = sp.Popen(
+        ["ffmpeg", "-v", "error", "-i", audio_path,
+         "-vn", "-ac", "1", "-ar", "16000", "-f", "s16le", "-"],
+        stdout=sp.PIPE, stderr=sp.DEVNULL,
+    )
+    # Stream the PCM through the hash so memory stays flat for long files
+    for block in iter(lambda: proc.stdout.read(READ_SIZE), b""):
+        digest.update(block)
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
+    return digest.hexdigest()
+
+
+def _file_sha256(audio_path):
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def in_flight(audio_hash, session_id):
+    """Run the block for one request per audio and session at a time (in this process)."""
+    key = (audio_hash, session_id)
+    with _in_flight_lock:
+        entry = _IN_FLIGHT.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _in_flight_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _IN_FLIGHT[key]
+
+
+def get_transcript(audio_hash, session_id):
+    """Cached TranscriptCache entry for this audio in this session, or None if missing or expired."""
+    entry = TranscriptCache.query.get((audio_hash, session_id))
+    if entry is None or entry.expires_at <= datetime.utcnow():
+        return None
+    return entry
+
+
+def put_transcript(audio_hash, session_id, text, expires_at):
+    # A concurrent retry may have stored the same audio first; either copy is fine
+    try:
+        db.session.merge(TranscriptCache(
+            audio_hash=audio_hash,
+            session_id=session_id,
+            transcription_text=text,
+            expires_at=expires_at,
+        ))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def purge_expired():
+    deleted = TranscriptCache.query.filter(
+        TranscriptCache.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    if deleted:
+        db.session.commit()
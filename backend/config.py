@@ -18,3 +18,68 @@ DATABASE_URI         = must_get("DATABASE_URI")
 OPENAI_API_KEY       = must_get("OPENAI_API_KEY")
 AUDIO_UPLOAD_FOLDER  = os.getenv("AUDIO_UPLOAD_FOLDER",
                                  "/var/www/scrib/audio_uploads")
+# Bounds the source upload; long recordings are split for Whisper (services.py)
+MAX_UPLOAD_MB        = int(os.getenv("MAX_UPLOAD_MB", "500"))
+DB_POOL_SIZE         = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW      = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# Optional read replicas (comma-separated URIs); see replicas.py
+DATABASE_REPLICA_URIS   = [u.strip() for u in os.getenv("DATABASE_REPLICA_URIS", "").split(",") if u.strip()]
+REPLICA_STICKY_SECONDS  = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+
+# 4) LLM prompt budgets ---------------------------------------------
+# Transcripts above INTERPRETATION_MAX_INPUT_TOKENS are either truncated
+# or routed to the long_transcript model profile (OVERSIZE_POLICY = "truncate" | "route").
+TITLE_MAX_INPUT_TOKENS          = int(os.getenv("TITLE_MAX_INPUT_TOKENS", "1500"))
+INTERPRETATION_MAX_INPUT_TOKENS = int(os.getenv("INTERPRETATION_MAX_INPUT_TOKENS", "60000"))
+OVERSIZE_POLICY                 = os.getenv("OVERSIZE_POLICY", "route")
+LONG_TRANSCRIPT_MAX_INPUT_TOKENS = int(os.getenv("LONG_TRANSCRIPT_MAX_INPUT_TOKENS", "120000"))
+
+# 5) Model profiles per task (see model_router.py) ------------------
+# Calls move to the *_FALLBACK_MODEL while the primary's p95 latency is
+# above its *_LATENCY_BUDGET_MS. Only samples from the last
+# MODEL_LATENCY_MAX_AGE_SECONDS count, so a past outage is forgotten.
+MODEL_LATENCY_MAX_AGE_SECONDS     = int(os.getenv("MODEL_LATENCY_MAX_AGE_SECONDS", "900"))
+TITLE_MODEL                       = os.getenv("TITLE_MODEL", "gpt-4o-mini")
+TITLE_FALLBACK_MODEL              = os.getenv("TITLE_FALLBACK_MODEL", "gpt-3.5-turbo")
+TITLE_LATENCY_BUDGET_MS           = int(os.getenv("TITLE_LATENCY_BUDGET_MS", "3000"))
+INTERPRETATION_MODEL              = os.getenv("INTERPRETATION_MODEL", "gpt-4o")
+INTERPRETATION_FALLBACK_MODEL     = os.getenv("INTERPRETATION_FALLBACK_MODEL", "gpt-4o-mini")
+INTERPRETATION_LATENCY_BUDGET_MS  = int(os.getenv("INTERPRETATION_LATENCY_BUDGET_MS", "45000"))
+LONG_TRANSCRIPT_MODEL             = os.getenv("LONG_TRANSCRIPT_MODEL", "gpt-4o")
+LONG_TRANSCRIPT_FALLBACK_MODEL    = os.getenv("LONG_TRANSCRIPT_FALLBACK_MODEL", "gpt-4o-mini")
+LONG_TRANSCRIPT_LATENCY_BUDGET_MS = int(os.getenv("LONG_TRANSCRIPT_LATENCY_BUDGET_MS", "90000"))
+
+# 6) Section-parallel note generation -------------------------------
+# Opt-in per request (parallel_sections); each markdown section is then one
+# call, SECTION_PARALLEL_WORKERS calls at a time. Set MIN_SECTIONS > 0 to
+# also turn it on for templates with at least that many "## " sections.
+SECTION_PARALLEL_MIN_SECTIONS = int(os.getenv("SECTION_PARALLEL_MIN_SECTIONS", "0"))
+SECTION_PARALLEL_WORKERS      = int(os.getenv("SECTION_PARALLEL_WORKERS", "6"))
+
+# 7) Transcription scheduling (see transcribe_async.py) ------------
+# Shortest-job-first with aging: a waiting job gains AGING_FACTOR seconds
+# of priority per second waited. INITIAL_RTF seeds the ETA estimate
+# (processing seconds per second of audio) until real timings come in.
+TRANSCRIBE_WORKERS      = int(os.getenv("TRANSCRIBE_WORKERS", "4"))
+TRANSCRIBE_AGING_FACTOR = float(os.getenv("TRANSCRIBE_AGING_FACTOR", "2"))
+TRANSCRIBE_INITIAL_RTF  = float(os.getenv("TRANSCRIBE_INITIAL_RTF", "0.1"))
+
+# 8) Request profiling (see profiling.py) ---------------------------
+# Requests slower than PROFILE_SLOW_MS are dumped to PROFILE_DIR (newest
+# PROFILE_MAX_DUMPS kept). Full cProfile runs for requests carrying the
+# X-Profile-Token header (disabled while PROFILE_TOKEN is empty) and for a
+# PROFILE_SAMPLE_RATE fraction of all requests.
+PROFILE_ENABLED        = os.getenv("PROFILE_ENABLED", "1") == "1"
+PROFILE_TOKEN          = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE    = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS        = int(os.getenv("PROFILE_SLOW_MS", "5000"))
+PROFILE_DIR            = os.getenv("PROFILE_DIR", "/var/www/scrib/profiles")
+PROFILE_MAX_DUMPS      = int(os.getenv("PROFILE_MAX_DUMPS", "200"))
+PROFILE_STACK_SAMPLING = os.getenv("PROFILE_STACK_SAMPLING", "1") == "1"
+
+# 9) Live transcription (see live_transcribe.py) --------------------
+# Frames are transcribed as a rolling window; once it holds this many
+# seconds of audio the segment is finalised and a new window starts.
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "20"))
@@ -0,0 +1,57 @@
+# green.py
+"""
+Cooperative I/O under the eventlet worker.
+
+wsgi.py / run.py call monkey_patch() before anything else is imported, so
+sockets (OpenAI HTTP calls, Socket.IO) and psycopg2 queries yield to other
+greenlets instead of blocking the whole worker. Work that cannot yield
+(ffmpeg, CPU-heavy tokenising) goes through run_blocking(), which hands it
+to eventlet's real-thread pool. Without eventlet (e.g. `flask run`) the
+helpers simply call straight through.
+"""
+import subprocess
+import sys
+
+try:
+    import eventlet
+    from eventlet import patcher, tpool
+except ImportError:  # optional outside the eventlet worker
+    eventlet = None
+
+
+def monkey_patch():
+    """Patch the stdlib and psycopg2 for eventlet. Call first thing."""
+    eventlet.monkey_patch()
+    if not patcher.is_monkey_patched("psycopg"):
+        # monkey_patch() silently skips psycopg2 if it could not import it
+        try:
+            from eventlet.support import psycopg2_patcher
+            psycopg2_patcher.make_psycopg_green()
+        except ImportError as e:
+            # stderr: stdout may be a protocol (see tests/eventlet_server.py)
+            print("Warning: psycopg2 is not green, DB queries will block the worker:", e,
+                  file=sys.stderr)
+
+
+def is_green():
+    return eventlet is not None and patcher.is_monkey_patched("socket")
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Run fn in a real OS thread when under eventlet, so the hub keeps going."""
+    if is_green():
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def original_subprocess():
+    """The unpatched subprocess module, for use inside run_blocking()."""
+    if is_green():
+        return patcher.original("subprocess")
+    return subprocess
+
+
+def run_ffmpeg(args, **kwargs):
+    """Run an ffmpeg (or ffprobe) command without stalling other greenlets."""
+    kwargs.setdefault("check", True)
+    return run_blocking(original_subprocess().run, args, **kwargs)
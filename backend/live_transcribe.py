@@ -0,0 +1,293 @@
+# live_transcribe.py
+"""
+Live (partial) transcription over Socket.IO.
+
+While recording, the browser rotates its MP3 recorder every few seconds and
+emits each finished frame on the "audio_frame" event. Every frame is stored in
+the same temp_chunks folder used by /chunks, so merge-chunks keeps working, and
+is appended to a rolling window that is re-transcribed as it grows:
+
+  * "transcript_segment" with final=False  → partial text for the open window
+  * "transcript_segment" with final=True   → the window is full and closed
+
+When recording stops, merge-chunks calls finalise() which only has to
+transcribe whatever is left in the last open window, so the wait after
+"Stop" no longer scales with the length of the consult.
+
+Frames carry a client-generated chunk_id. The stored file is named after
+it, so a frame that is re-sent (or falls back to /chunks after a slow ack)
+is stored and counted once.
+"""
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+import openai
+from flask_socketio import SocketIO, join_room
+
+import config
+from models import Session
+
+socketio = SocketIO()
+
+# Upper bound we accept for a single frame's reported duration (guards
+# against bogus clients); the window length is config.LIVE_WINDOW_SECONDS.
+MAX_FRAME_SECONDS = 30.0
+# Live state nobody has touched for this long (abandoned recordings) is dropped
+LIVE_MAX_IDLE_SECONDS = 3600
+
+_CHUNK_ID = re.compile(r"^[A-Za-z0-9-]{8,64}$")
+
+# LIVE_SESSIONS[123] = LiveTranscript(...)
+LIVE_SESSIONS = {}
+_LIVE_SESSIONS_LOCK = threading.Lock()
+
+
+class LiveTranscript:
+    """Per-session state: finalised segments plus the currently open window."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.segments = []        # finalised segment texts, in order
+        self.window = []          # (mp3 bytes, seconds) frames of the open window
+        self.frame_count = 0      # frames received, to cross-check merge-chunks
+        self.transcribed_count = 0  # frame_count at the last transcription
+        self.updated_at = time.monotonic()
+        # `lock` guards the fields above and is only held briefly, so frames
+        # are acked straight away; `transcribe_lock` runs one Whisper call at
+        # a time, which keeps the windows in order.
+        self.lock = threading.Lock()
+        self.transcribe_lock = threading.Lock()
+
+    @property
+    def room(self):
+        return f"session_{self.session_id}"
+
+    @property
+    def window_seconds(self):
+        return sum(seconds for _, seconds in self.window)
+
+    def add_frame(self, audio_bytes, seconds):
+        with self.lock:
+            self.window.append((audio_bytes, seconds))
+            self.frame_count += 1
+            self.updated_at = time.monotonic()
+
+    def process_window(self):
+        """
+        Transcribe the open window. Emits a partial segment, or a final one
+        (and starts a fresh window) once the window is long enough.
+        Runs as a background task, one per frame; tasks that find nothing
+        new since the last transcription return straight away.
+        """
+        with self.transcribe_lock:
+            with self.lock:
+                if not self.window or self.transcribed_count == self.frame_count:
+                    return
+                frames = list(self.window)
+                final = self.window_seconds >= config.LIVE_WINDOW_SECONDS
+                index = len(self.segments)
+                prompt = self._prompt()
+                self.transcribed_count = self.frame_count
+
+            text = _transcribe_frames(frames, prompt)
+
+            with self.lock:
+                if final:
+                    self._close_window(text, len(frames))
+
+        self._emit(index, text, final)
+
+    def finalise(self):
+        """Close the last window and return the full transcript text."""
+        with self.transcribe_lock:
+            with self.lock:
+                frames = list(self.window)
+                index = len(self.segments)
+                prompt = self._prompt()
+            if frames:
+                text = _transcribe_frames(frames, prompt)
+                with self.lock:
+                    self._close_window(text, len(frames))
+                self._emit(index, text, True)
+            with self.lock:
+                return " ".join(s for s in self.segments if s).strip()
+
+    # ── internals ─────────────────────────────────────────────────
+    def _prompt(self):
+        # The tail of the previous segment keeps Whisper consistent
+        # across window boundaries (names, spelling, punctuation).
+        return self.segments[-1][-200:] if self.segments else None
+
+    def _close_window(self, text, frame_count):
+        # Frames that arrived during the Whisper call open the next window
+        self.segments.append(text)
+        self.window = self.window[frame_count:]
+
+    def _emit(self, index, text, final):
+        socketio.emit("transcript_segment", {
+            "session_id": self.session_id,
+            "index": index,
+            "text": text,
+            "final": final,
+        }, to=self.room)
+
+
+def _transcribe_frames(frames, prompt=None):
+    # MP3 is a sequence of self-contained frames, so the recorder's
+    # per-frame files can simply be concatenated into one stream.
+    tmp = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
+    try:
+        for audio_bytes, _ in frames:
+            tmp.write(audio_bytes)
+        tmp.close()
+
+        with open(tmp.name, "rb") as audio_file:
+            if prompt:
+                response = openai.Audio.transcribe("whisper-1", audio_file, prompt=prompt)
+            else:
+                response = openai.Audio.transcribe("whisper-1", audio_file)
+        return response["text"].strip()
+    finally:
+        try:
+            os.remove(tmp.name)
+        except OSError:
+            pass
+
+
+def get_live_transcript(session_id, create=False):
+    with _LIVE_SESSIONS_LOCK:
+        live = LIVE_SESSIONS.get(session_id)
+        if live is None and create:
+            live = LIVE_SESSIONS[session_id] = LiveTranscript(session_id)
+        return live
+
+
+def finalise(session_id, expected_frames=None):
+    """
+    Pop the live state for a session and return its assembled transcript,
+    or None if the session was not recorded live (or if some chunks arrived
+    over plain HTTP, in which case the caller must transcribe the full file).
+    """
+    with _LIVE_SESSIONS_LOCK:
+        live = LIVE_SESSIONS.pop(session_id, None)
+    if live is None:
+        return None
+    if expected_frames is not None and live.frame_count != expected_frames:
+        print(f"Live transcript for session {session_id} is incomplete "
+              f"({live.frame_count}/{expected_frames} frames); falling back.")
+        return None
+    return live.finalise()
+
+
+def discard(session_id):
+    """Drop a session's live state (deleted session, abandoned recording)."""
+    with _LIVE_SESSIONS_LOCK:
+        LIVE_SESSIONS.pop(session_id, None)
+
+
+def purge_stale(max_idle=LIVE_MAX_IDLE_SECONDS):
+    """Drop live state of recordings that stopped without a merge."""
+    cutoff = time.monotonic() - max_idle
+    with _LIVE_SESSIONS_LOCK:
+        for session_id, live in list(LIVE_SESSIONS.items()):
+            if live.updated_at < cutoff:
+                del LIVE_SESSIONS[session_id]
+
+
+def chunk_dir(session_id):
+    return os.path.join(config.AUDIO_UPLOAD_FOLDER, "temp_chunks", f"session_{session_id}")
+
+
+def chunk_filename(chunk_id=None):
+    """File name for a chunk; client ids that are not plain tokens get a fresh one."""
+    if not chunk_id or not _CHUNK_ID.match(str(chunk_id)):
+        chunk_id = uuid.uuid4()
+    return f"chunk_{chunk_id}.mp3"
+
+
+def store_chunk(session_id, filename, write):
+    """
+    Create the chunk file and fill it via write(file). Returns False if a
+    chunk with this name was already stored (a re-sent frame).
+    """
+    temp_dir = chunk_dir(session_id)
+    os.makedirs(temp_dir, exist_ok=True)
+    path = os.path.join(temp_dir, filename)
+    try:
+        f = open(path, "xb")
+    except FileExistsError:
+        return False
+    try:
+        with f:
+            write(f)
+    except BaseException:
+        os.remove(path)
+        raise
+    return True
+
+
+# -------------------------------------------------------------------
+# SOCKET.IO EVENTS
+# -------------------------------------------------------------------
+
+@socketio.on("join_live")
+def on_join_live(data):
+    """Subscribe this client to a session's transcript segments."""
+    session_id = (data or {}).get("session_id")
+    if not session_id:
+        return {"error": "Missing session_id"}
+    join_room(f"session_{session_id}")
+    return {"ok": True}
+
+
+@socketio.on("audio_frame")
+def on_audio_frame(data):
+    """
+    Receive one MP3 frame:
+    {session_id, chunk_id, audio: <bytes>, duration: <seconds>}.
+    Returns an ack once the frame is on disk, so the client can safely call
+    merge-chunks after acknowledging the last frame.
+    """
+    data = data or {}
+    try:
+        session_id = int(data.get("session_id"))
+    except (TypeError, ValueError):
+        session_id = None
+    audio = data.get("audio")
+    if not session_id or not audio:
+        return {"error": "Missing session_id or audio"}
+
+    if not Session.query.get(session_id):
+        return {"error": "Session not found"}
+
+    try:
+        seconds = min(max(float(data.get("duration") or 0), 0.0), MAX_FRAME_SECONDS)
+    except (TypeError, ValueError):
+        seconds = 0.0
+
+    # Same layout as /sessions/<id>/chunks, so merge-chunks sees these frames
+    live = get_live_transcript(session_id, create=True)
+    filename = chunk_filename(data.get("chunk_id"))
+    try:
+        stored = store_chunk(session_id, filename, lambda f: f.write(audio))
+    except Exception as e:
+        print("Error saving live frame:", e)
+        return {"error": f"Error saving frame: {e}"}
+
+    join_room(live.room)
+    if stored:
+        live.add_frame(audio, seconds)
+        socketio.start_background_task(_process_window_safely, live)
+
+    return {"ok": True, "chunk_filename": filename}
+
+
+def _process_window_safely(live):
+    try:
+        live.process_window()
+    except Exception as e:
+        print(f"Error in live transcription for session {live.session_id}:", e)
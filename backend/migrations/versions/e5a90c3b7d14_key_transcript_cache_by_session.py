@@ -0,0 +1,42 @@
+"""key transcript_cache by session
+
+Revision ID: e5a90c3b7d14
+Revises: 6b8d0e4f1a27
+Create Date: 2026-10-19 20:10:44.113907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a90c3b7d14'
+down_revision = '6b8d0e4f1a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing entries are not linked to a session and may belong to deleted
+    # ones; it is only a cache, so start it over with the new key.
+    op.drop_table('transcript_cache')
+    op.create_table('transcript_cache',
+    sa.Column('audio_hash', sa.String(length=64), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('transcription_text', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.session_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('audio_hash', 'session_id')
+    )
+
+
+def downgrade():
+    op.drop_table('transcript_cache')
+    op.create_table('transcript_cache',
+    sa.Column('audio_hash', sa.String(length=64), nullable=False),
+    sa.Column('transcription_text', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('audio_hash')
+    )
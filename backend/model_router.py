@@ -0,0 +1,143 @@
+# model_router.py
+"""
+Per-task model profiles with latency-aware fallback.
+
+Each task (title, interpretation, long_transcript) has a primary and a
+fallback model plus a p95 latency budget. While the primary's observed p95
+is over budget, calls go to the fallback; every PROBE_EVERY-th call still
+goes to the primary so we notice when it recovers. Failed calls count as
+over budget. Samples older than MODEL_LATENCY_MAX_AGE_SECONDS are dropped,
+so the primary gets its calls back at most that long after an outage even
+if few probes were sent meanwhile. Routing decisions and per-model
+latencies are kept in memory for /api/interpretations/usage.
+"""
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import config
+
+# e.g. MODEL_PROFILES["title"] = {"primary": "gpt-4o-mini", "fallback": ..., ...}
+MODEL_PROFILES = {
+    "title": {
+        "primary": config.TITLE_MODEL,
+        "fallback": config.TITLE_FALLBACK_MODEL,
+        "latency_budget_ms": config.TITLE_LATENCY_BUDGET_MS,
+        "json": True,
+    },
+    "interpretation": {
+        "primary": config.INTERPRETATION_MODEL,
+        "fallback": config.INTERPRETATION_FALLBACK_MODEL,
+        "latency_budget_ms": config.INTERPRETATION_LATENCY_BUDGET_MS,
+        "json": False,
+    },
+    "long_transcript": {
+        "primary": config.LONG_TRANSCRIPT_MODEL,
+        "fallback": config.LONG_TRANSCRIPT_FALLBACK_MODEL,
+        "latency_budget_ms": config.LONG_TRANSCRIPT_LATENCY_BUDGET_MS,
+        "json": False,
+    },
+}
+
+LATENCY_WINDOW = 50   # at most the last N calls per model are used for p95
+MIN_SAMPLES = 5       # don't judge a model on fewer calls than this
+PROBE_EVERY = 10      # while degraded, 1 in N calls still tries the primary
+
+_lock = threading.Lock()
+MODEL_LATENCIES = {}              # model -> deque of (monotonic time, latency_ms)
+ROUTING_LOG = deque(maxlen=200)   # recent routing decisions
+_degraded_calls = {}              # task -> calls routed away since degrading
+
+
+def _p95(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+def record_latency(model, latency_ms):
+    with _lock:
+        MODEL_LATENCIES.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(
+            (time.monotonic(), latency_ms))
+
+
+def _recent_latencies(model):
+    """Latencies of `model` still within MODEL_LATENCY_MAX_AGE_SECONDS."""
+    cutoff = time.monotonic() - config.MODEL_LATENCY_MAX_AGE_SECONDS
+    with _lock:
+        samples = MODEL_LATENCIES.get(model)
+        if samples is None:
+            return []
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return [latency for _, latency in samples]
+
+
+def record_failure(task, model, latency_ms):
+    """
+    A failed call (error or timeout) counts as at least over the task's
+    budget, so a primary that keeps failing is routed around instead of
+    making every call wait for it first.
+    """
+    budget = MODEL_PROFILES[task]["latency_budget_ms"]
+    record_latency(model, max(latency_ms, budget + 1))
+
+
+def model_p95(model):
+    samples = _recent_latencies(model)
+    if len(samples) < MIN_SAMPLES:
+        return None
+    return _p95(samples)
+
+
+def _log(task, model, reason):
+    ROUTING_LOG.append({
+        "at": datetime.utcnow().isoformat(),
+        "task": task,
+        "model": model,
+        "reason": reason,
+    })
+
+
+def choose_model(task):
+    """Return (model, profile) for a task, logging the routing decision."""
+    profile = MODEL_PROFILES[task]
+    primary, fallback = profile["primary"], profile["fallback"]
+    p95 = model_p95(primary)
+
+    if not fallback or fallback == primary or p95 is None or p95 <= profile["latency_budget_ms"]:
+        _degraded_calls.pop(task, None)
+        _log(task, primary, "primary")
+        return primary, profile
+
+    count = _degraded_calls.get(task, 0) + 1
+    _degraded_calls[task] = count
+    if count % PROBE_EVERY == 0:
+        _log(task, primary, f"probe (p95 {p95} ms > {profile['latency_budget_ms']} ms)")
+        return primary, profile
+
+    _log(task, fallback, f"fallback (p95 {p95} ms > {profile['latency_budget_ms']} ms)")
+    return fallback, profile
+
+
+def fallback_after_error(task, failed_model, error):
+    """Model to retry with after `failed_model` raised, or None."""
+    fallback = MODEL_PROFILES[task]["fallback"]
+    if not fallback or fallback == failed_model:
+        return None
+    _log(task, fallback, f"fallback after error on {failed_model}: {error}")
+    return fallback
+
+
+def routing_summary():
+    latencies = {m: _recent_latencies(m) for m in list(MODEL_LATENCIES)}
+    return {
+        "profiles": MODEL_PROFILES,
+        "models": {
+            m: {"calls": len(s), "p95_ms": _p95(s)} for m, s in latencies.items()
+        },
+        "recent_decisions": list(ROUTING_LOG)[-50:],
+    }
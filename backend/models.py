@@ -1,8 +1,21 @@
 # models.py
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
 from datetime import datetime
 
-db = SQLAlchemy()
+class RoutingSession(FlaskSession):
+    """
+    Sends reads to the replica chosen for this request (g.db_replica, see
+    replicas.py); flushes and everything else go to the primary.
+    """
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = g.get("db_replica") if has_app_context() else None
+        if replica and not self._flushing:
+            return db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class Session(db.Model):
     __tablename__ = 'sessions'
@@ -14,6 +27,8 @@ class Session(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     # Relationship to interpretations (with cascade deletion)
     interpretations = db.relationship('Interpretation', backref='session', cascade="all, delete-orphan")
+    # Cached transcripts of this session's audio go with it
+    transcript_cache = db.relationship('TranscriptCache', backref='session', cascade="all, delete-orphan")
     transcription_expires_at = db.Column(db.DateTime, nullable=True)
 
 class Template(db.Model):
@@ -34,3 +49,26 @@ class Interpretation(db.Model):
     template_id = db.Column(db.Integer, db.ForeignKey('templates.template_id'), nullable=False)
     generated_text = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # LLM accounting for the call that produced generated_text
+    model_used = db.Column(db.String(64), nullable=True)
+    input_tokens = db.Column(db.Integer, nullable=True)
+    output_tokens = db.Column(db.Integer, nullable=True)
+    latency_ms = db.Column(db.Integer, nullable=True)
+    # Per-section output (JSON list of {heading, hash, text}) when the note
+    # was generated section by section; lets template edits regenerate
+    # only the sections that changed.
+    sections_json = db.Column(db.Text, nullable=True)
+
+class TranscriptCache(db.Model):
+    """
+    Whisper transcripts keyed by a fingerprint of the decoded audio and the
+    session it was uploaded to, so a transcript never outlives its session
+    or reappears in another one.
+    """
+    __tablename__ = 'transcript_cache'
+
+    audio_hash = db.Column(db.String(64), primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('sessions.session_id', ondelete='CASCADE'), primary_key=True)
+    transcription_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
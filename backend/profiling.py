@@ -0,0 +1,279 @@
+# profiling.py
+"""
+On-demand request profiling and slow-request capture.
+
+Every request records its SQL statements and outbound HTTP calls (with
+timings) and, via a SIGPROF timer, CPU stack samples of its own greenlet.
+On top of that a request is fully profiled with cProfile when:
+
+  * it carries  X-Profile-Token: <PROFILE_TOKEN>  (operator opt-in), or
+  * it is picked by PROFILE_SAMPLE_RATE (0.0 - 1.0).
+
+Profiled requests, and any request slower than PROFILE_SLOW_MS, are dumped
+to PROFILE_DIR, a ring buffer of at most PROFILE_MAX_DUMPS dumps:
+
+  <name>.json    request info, SQL + HTTP timings
+  <name>.folded  stack samples in collapsed format (flamegraph.pl, speedscope)
+  <name>.prof    cProfile stats (snakeviz, flameprof), when profiled
+
+The dump name is returned in the X-Profile-Dump response header.
+
+Under eventlet every greenlet runs on the same OS thread, so cProfile also
+sees whatever other requests run while the profiled one waits on I/O; the
+stack samples and SQL/HTTP timings are attributed per request. Work handed
+to background threads (transcription jobs, parallel sections) is not
+attributed to the request that started it.
+"""
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import signal
+import threading
+import time
+from datetime import datetime
+
+import requests
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+try:
+    from greenlet import getcurrent as _current_task
+except ImportError:  # no greenlet: key samples by thread instead
+    _current_task = threading.current_thread
+
+STACK_SAMPLE_INTERVAL = 0.01  # seconds of CPU time between samples
+MAX_STACK_DEPTH = 64
+MAX_RECORDED_CALLS = 500      # per request, for SQL and HTTP each
+
+# Stack samples of in-flight requests, keyed by greenlet (or thread)
+_ACTIVE = {}
+# Only one cProfile profiler can be active per thread (and under eventlet
+# all greenlets share one thread), so concurrent opt-ins take turns.
+_cprofile_lock = threading.Lock()
+_dump_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql = []
+        self.http = []
+        self.stacks = {}
+        self.profiler = None
+
+    def add_stack(self, frame):
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        key = ";".join(reversed(names))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+
+
+def init_app(app):
+    if not config.PROFILE_ENABLED:
+        return
+
+    @app.before_request
+    def start_profile():
+        prof = RequestProfile()
+        g.request_profile = prof
+        _ACTIVE[_current_task()] = prof
+        if _wants_cprofile() and _cprofile_lock.acquire(blocking=False):
+            prof.profiler = cProfile.Profile()
+            prof.profiler.enable()
+
+    @app.after_request
+    def finish_profile(response):
+        prof = g.pop("request_profile", None)
+        if prof is None:
+            return response
+        _ACTIVE.pop(_current_task(), None)
+        if prof.profiler is not None:
+            prof.profiler.disable()
+            _cprofile_lock.release()
+
+        elapsed_ms = (time.perf_counter() - prof.started) * 1000
+        if prof.profiler is not None or elapsed_ms >= config.PROFILE_SLOW_MS:
+            try:
+                name = _write_dump(prof, elapsed_ms, response.status_code)
+                response.headers["X-Profile-Dump"] = name
+            except Exception as e:
+                print("Could not write request profile:", e)
+        return response
+
+    @app.teardown_request
+    def drop_profile(exc):
+        # after_request is skipped on unhandled errors; don't leak state
+        prof = g.pop("request_profile", None)
+        _ACTIVE.pop(_current_task(), None)
+        if prof is not None and prof.profiler is not None:
+            prof.profiler.disable()
+            _cprofile_lock.release()
+
+    _install_sql_timing()
+    _install_http_timing()
+    _install_stack_sampler()
+
+
+def _wants_cprofile():
+    token = request.headers.get("X-Profile-Token")
+    if token and config.PROFILE_TOKEN and hmac.compare_digest(token.encode(), config.PROFILE_TOKEN.encode()):
+        return True
+    return config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE
+
+
+def _current_profile():
+    if not has_app_context():
+        return None
+    return g.get("request_profile")
+
+
+# ── SQL ────────────────────────────────────────────────────────────
+def _install_sql_timing():
+    # Engine-wide listeners: install once, however many apps call init_app()
+    for name, listener in _SQL_LISTENERS:
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["profile_started"].pop()
+    _record_sql(conn, statement, started)
+
+
+def _discard_cursor_timing(context):
+    # after_cursor_execute does not fire for failed statements; pop
+    # their start time here so conn.info doesn't grow per error
+    conn = context.connection
+    started = conn.info.get("profile_started") if conn is not None else None
+    if not started:
+        return
+    _record_sql(conn, context.statement, started.pop(),
+                error=type(context.original_exception).__name__)
+
+
+def _record_sql(conn, statement, started, error=None):
+    prof = _current_profile()
+    if prof is None or len(prof.sql) >= MAX_RECORDED_CALLS:
+        return
+    entry = {
+        "statement": statement,
+        "ms": round((time.perf_counter() - started) * 1000, 2),
+        "database": conn.engine.url.database,
+    }
+    if error:
+        entry["error"] = error
+    prof.sql.append(entry)
+
+
+_SQL_LISTENERS = (
+    ("before_cursor_execute", _before_cursor_execute),
+    ("after_cursor_execute", _after_cursor_execute),
+    ("handle_error", _discard_cursor_timing),
+)
+
+
+# ── Outbound HTTP (OpenAI goes through requests) ───────────────────
+def _install_http_timing():
+    original_send = requests.Session.send
+    if getattr(original_send, "_profiled", False):
+        return
+
+    def timed_send(self, req, **kwargs):
+        prof = _current_profile()
+        if prof is None:
+            return original_send(self, req, **kwargs)
+        started = time.perf_counter()
+        status = None
+        try:
+            response = original_send(self, req, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            if len(prof.http) < MAX_RECORDED_CALLS:
+                prof.http.append({
+                    "method": req.method,
+                    "url": req.url.split("?", 1)[0],
+                    "status": status,
+                    "ms": round((time.perf_counter() - started) * 1000, 2),
+                })
+
+    timed_send._profiled = True
+    requests.Session.send = timed_send
+
+
+# ── CPU stack sampling ─────────────────────────────────────────────
+def _install_stack_sampler():
+    if not config.PROFILE_STACK_SAMPLING:
+        return
+
+    def sample(signum, frame):
+        prof = _ACTIVE.get(_current_task())
+        if prof is not None:
+            prof.add_stack(frame)
+
+    try:
+        signal.signal(signal.SIGPROF, sample)
+        signal.setitimer(signal.ITIMER_PROF, STACK_SAMPLE_INTERVAL, STACK_SAMPLE_INTERVAL)
+    except (ValueError, AttributeError) as e:  # not the main thread, or no SIGPROF
+        print("Stack sampling disabled:", e)
+
+
+# ── Ring buffer on disk ────────────────────────────────────────────
+def _write_dump(prof, elapsed_ms, status):
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", request.path).strip("_")[:60] or "root"
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{request.method}_{slug}_{int(elapsed_ms)}ms"
+    base = os.path.join(config.PROFILE_DIR, name)
+
+    with open(base + ".json", "w") as f:
+        json.dump({
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("utf-8", "replace"),
+            "status": status,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "profiled": prof.profiler is not None,
+            "sql_ms": round(sum(q["ms"] for q in prof.sql), 2),
+            "http_ms": round(sum(h["ms"] for h in prof.http), 2),
+            "sql": prof.sql,
+            "http": prof.http,
+        }, f, indent=2)
+    if prof.stacks:
+        with open(base + ".folded", "w") as f:
+            for stack, count in sorted(prof.stacks.items()):
+                f.write(f"{stack} {count}\n")
+    if prof.profiler is not None:
+        prof.profiler.dump_stats(base + ".prof")
+
+    _prune_dumps()
+    return name
+
+
+def _prune_dumps():
+    """Keep only the newest PROFILE_MAX_DUMPS dumps (all files of a dump go together)."""
+    with _dump_lock:
+        dumps = {}
+        for filename in os.listdir(config.PROFILE_DIR):
+            stem, ext = os.path.splitext(filename)
+            if ext in (".json", ".folded", ".prof"):
+                dumps.setdefault(stem, []).append(filename)
+        # names start with a UTC timestamp, so they sort oldest first
+        for stem in sorted(dumps)[:-config.PROFILE_MAX_DUMPS or None]:
+            for filename in dumps[stem]:
+                try:
+                    os.remove(os.path.join(config.PROFILE_DIR, filename))
+                except OSError:
+                    pass
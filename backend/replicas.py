@@ -0,0 +1,144 @@
+# replicas.py
+"""
+Optional read-replica routing.
+
+With DATABASE_REPLICA_URIS set, GET requests read from a replica (round
+robin) while everything else stays on the primary (config.DATABASE_URI).
+Reads go back to the primary when:
+
+  * the client wrote something in the last REPLICA_STICKY_SECONDS
+    (tracked with a cookie), or the session being read was mutated in
+    that window by anyone (tracked here, per session_id);
+  * every replica lags the primary by more than REPLICA_MAX_LAG_SECONDS.
+
+The actual engine switch happens in models.RoutingSession.get_bind, based
+on g.db_replica set by the before_request hook below.
+"""
+import itertools
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import text
+
+import config
+
+STICKY_COOKIE = "db_sticky_until"
+LAG_CHECK_INTERVAL = 5  # seconds between lag probes per replica
+
+# RECENT_WRITES[123] = monotonic time of the last mutation of session 123
+RECENT_WRITES = {}
+# REPLICA_LAG["replica_0"] = (checked_at, lag_seconds or None if unreachable)
+REPLICA_LAG = {}
+_lock = threading.Lock()
+_round_robin = None
+
+
+def replica_binds():
+    """SQLALCHEMY_BINDS entries for the configured replicas."""
+    return {f"replica_{i}": uri for i, uri in enumerate(config.DATABASE_REPLICA_URIS)}
+
+
+def init_app(app, db):
+    global _round_robin
+    names = list(replica_binds())
+    if not names:
+        return
+    _round_robin = itertools.cycle(names)
+
+    @app.before_request
+    def choose_read_database():
+        g.db_replica = None
+        if request.method != "GET" or _must_read_primary():
+            return
+        g.db_replica = _pick_replica(db, len(names))
+
+    @app.after_request
+    def remember_write(response):
+        if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+            session_id = _request_session_id()
+            if session_id is not None:
+                mark_session_written(session_id)
+            sticky_until = time.time() + config.REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, str(int(sticky_until)),
+                                max_age=int(config.REPLICA_STICKY_SECONDS) + 1,
+                                httponly=True, samesite="Lax")
+        return response
+
+
+def mark_session_written(session_id):
+    """Record a mutation so reads of this session stay on the primary."""
+    with _lock:
+        RECENT_WRITES[int(session_id)] = time.monotonic()
+
+
+def _request_session_id():
+    session_id = (request.view_args or {}).get("session_id")
+    if session_id is None:
+        session_id = request.args.get("session_id")
+    if session_id is None and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get("session_id")
+    try:
+        return int(session_id) if session_id is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _must_read_primary():
+    # This client wrote recently: read its own writes
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+
+    # Someone mutated this session recently
+    session_id = _request_session_id()
+    if session_id is None:
+        return False
+    now = time.monotonic()
+    with _lock:
+        written = RECENT_WRITES.get(session_id)
+        if written is not None and now - written > config.REPLICA_STICKY_SECONDS:
+            del RECENT_WRITES[session_id]
+            written = None
+    return written is not None
+
+
+def _pick_replica(db, count):
+    """Next replica within the lag threshold, or None for the primary."""
+    for _ in range(count):
+        name = next(_round_robin)
+        lag = replica_lag(db, name)
+        if lag is not None and lag <= config.REPLICA_MAX_LAG_SECONDS:
+            return name
+    return None
+
+
+def replica_lag(db, name):
+    """Replication lag of a replica in seconds (cached), None if unreachable."""
+    now = time.monotonic()
+    cached = REPLICA_LAG.get(name)
+    if cached and now - cached[0] < LAG_CHECK_INTERVAL:
+        return cached[1]
+
+    engine = db.engines[name]
+    try:
+        with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                # Fully replayed means no lag, even if the primary is idle
+                lag = conn.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )).scalar()
+            else:
+                # No replication status to ask for (e.g. local test databases)
+                conn.execute(text("SELECT 1"))
+                lag = 0
+        lag = float(lag)
+    except Exception as e:
+        print(f"Replica {name} unavailable, reading from primary: {e}")
+        lag = None
+
+    REPLICA_LAG[name] = (now, lag)
+    return lag
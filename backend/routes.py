@@ -1,11 +1,17 @@
 # routes.py
 import os
-import subprocess
-from flask import Blueprint, request, jsonify
+import threading
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from sqlalchemy.orm import joinedload
 from models import db, Session, Template, Interpretation
 import config
-from services import transcribe_audio_file, generate_interpretation
-import uuid
+from services import (transcribe_audio_file, generate_interpretation, save_transcription,
+                      usage_summary, regenerate_changed_sections)
+import live_transcribe
+from green import run_ffmpeg
+from upload_stream import stream_audio_upload, UploadError
+from transcribe_async import schedule_transcription, job_status, SESSION_JOBS, TRANSCRIPTION_STATUS
 import ffmpeg  # optional if you have a python-ffmpeg binding, or just call subprocess
 import shutil
 
@@ -63,6 +69,73 @@ def get_session_details(session_id):
         "transcription_expires_at": s.transcription_expires_at.isoformat() if s.transcription_expires_at else None
     }), 200
 
+OVERVIEW_SECTIONS = {"session", "interpretations", "templates"}
+
+@routes_blueprint.route("/sessions/<int:session_id>/overview", methods=["GET"])
+def get_session_overview(session_id):
+    """
+    Everything the session view needs in one response: the session, its
+    interpretations and a lightweight template index (no template_text).
+    ?include=session,interpretations,templates selects parts (default: all).
+    Responses carry an ETag, so unchanged sessions come back as 304.
+    """
+    include = request.args.get("include")
+    parts = {p.strip() for p in include.split(",") if p.strip()} if include else OVERVIEW_SECTIONS
+    unknown = parts - OVERVIEW_SECTIONS
+    if unknown:
+        return jsonify({"error": f"Unknown include: {', '.join(sorted(unknown))}"}), 400
+
+    query = Session.query
+    if "interpretations" in parts:
+        # One round trip for the session and its notes
+        query = query.options(joinedload(Session.interpretations))
+    s = query.filter(Session.session_id == session_id).first()
+    if not s:
+        return jsonify({"error": "Session not found"}), 404
+
+    result = {}
+    if "session" in parts:
+        result["session"] = {
+            "session_id": s.session_id,
+            "session_title": s.session_title,
+            "audio_file_path": s.audio_file_path,
+            "transcription_text": s.transcription_text,
+            "created_at": s.created_at.isoformat(),
+            "transcription_expires_at": s.transcription_expires_at.isoformat() if s.transcription_expires_at else None
+        }
+    if "interpretations" in parts:
+        interpretations = sorted(s.interpretations, key=lambda i: i.created_at, reverse=True)
+        result["interpretations"] = [{
+            "interpretation_id": i.interpretation_id,
+            "session_id": i.session_id,
+            "template_id": i.template_id,
+            "generated_text": i.generated_text,
+            "created_at": i.created_at.isoformat(),
+            "model_used": i.model_used,
+            "input_tokens": i.input_tokens,
+            "output_tokens": i.output_tokens,
+            "latency_ms": i.latency_ms
+        } for i in interpretations]
+    if "templates" in parts:
+        # Only the columns the index needs; template_text can be large
+        rows = db.session.query(
+            Template.template_id, Template.template_name,
+            Template.times_used, Template.favorite, Template.created_at
+        ).order_by(Template.created_at.desc()).all()
+        result["templates"] = [{
+            "template_id": t.template_id,
+            "template_name": t.template_name,
+            "times_used": t.times_used,
+            "favorite": t.favorite,
+            "created_at": t.created_at.isoformat()
+        } for t in rows]
+
+    response = jsonify(result)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # always revalidate via the ETag
+    response.add_etag()
+    return response.make_conditional(request)
+
 @routes_blueprint.route("/sessions/<int:session_id>", methods=["PUT"])
 def update_session(session_id):
     s = Session.query.get(session_id)
@@ -91,6 +164,7 @@ def delete_session(session_id):
         
         db.session.delete(s)
         db.session.commit()
+        live_transcribe.discard(session_id)
         return jsonify({"message": "Session deleted"}), 200
     except Exception as e:
         # Log full error traceback for debugging
@@ -105,77 +179,47 @@ def upload_audio(session_id):
         print("Session not found")
         return jsonify({"error": "Session not found"}), 404
 
-    if "file" not in request.files:
-        print("No file provided")
-        return jsonify({"error": "No file provided"}), 400
-
-    file = request.files["file"]
-    if not file.filename:
-        print("Empty filename")
-        return jsonify({"error": "Empty filename"}), 400
-
-    os.makedirs(config.AUDIO_UPLOAD_FOLDER, exist_ok=True)
-    
-    # If the uploaded file is an MP3, save it directly
-    if file.filename.lower().endswith('.mp3'):
-        saved_mp3_path = os.path.join(config.AUDIO_UPLOAD_FOLDER, f"session_{session_id}_{file.filename}")
-        try:
-            print("Saving MP3 file to:", saved_mp3_path)
-            file.save(saved_mp3_path)
-        except Exception as e:
-            print("Error saving file:", e)
-            return jsonify({"error": f"Error saving file: {str(e)}"}), 500
-        mp3_path = saved_mp3_path
-    else:
-        # Otherwise, assume it's in WebM format and convert it to MP3
-        saved_webm_path = os.path.join(config.AUDIO_UPLOAD_FOLDER, f"session_{session_id}_{file.filename}")
-        try:
-            print("Saving file to:", saved_webm_path)
-            file.save(saved_webm_path)
-            print("File saved successfully.")
-        except Exception as e:
-            print("Error saving file:", e)
-            return jsonify({"error": f"Error saving file: {str(e)}"}), 500
-
-        mp3_filename = os.path.splitext(file.filename)[0] + ".mp3"
-        mp3_path = os.path.join(config.AUDIO_UPLOAD_FOLDER, f"session_{session_id}_{mp3_filename}")
-        try:
-            print("Converting file to MP3:", mp3_path)
-            subprocess.run(
-                ["ffmpeg", "-i", saved_webm_path, "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k", mp3_path],
-                check=True
-            )
-            print("Conversion successful.")
-            os.remove(saved_webm_path)
-        except Exception as e:
-            print("Error converting file:", e)
-            return jsonify({"error": f"Error converting file: {str(e)}"}), 500
-
+    # Pipe the body into ffmpeg as it arrives (see upload_stream.py)
     try:
+        mp3_path = stream_audio_upload(
+            request.stream, request.content_type,
+            config.AUDIO_UPLOAD_FOLDER, f"session_{session_id}_")
+    except UploadError as e:
+        print("Upload error:", e)
+        return jsonify({"error": str(e)}), e.status
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        print("Error saving file:", e)
+        return jsonify({"error": f"Error saving file: {str(e)}"}), 500
+
+    def transcribe_job():
+        s = Session.query.get(session_id)
         transcribe_audio_file(mp3_path, s)
         print("Transcription successful.")
-    except Exception as e:
-        print("Error during transcription:", e)
-        return jsonify({"error": f"Error during transcription: {str(e)}"}), 500
-    
-    # NEW: If the session title is still "Untitled session" and transcription is available,
-    # generate a short title via ChatGPT.
-    if s.session_title.strip().lower() == "untitled session" and s.transcription_text:
-        from services import generate_short_title  # Ensure this import is at the top or here
-        new_title = generate_short_title(s.transcription_text)
-        print(f"Auto-generated title: {new_title}")
-        s.session_title = new_title
-        db.session.commit()
 
-    try:
+        # NEW: If the session title is still "Untitled session" and transcription is available,
+        # generate a short title via ChatGPT.
+        if s.session_title.strip().lower() == "untitled session" and s.transcription_text:
+            from services import generate_short_title  # Ensure this import is at the top or here
+            new_title = generate_short_title(s.transcription_text)
+            print(f"Auto-generated title: {new_title}")
+            s.session_title = new_title
+            db.session.commit()
+
         s.audio_file_path = "/audio/" + os.path.basename(mp3_path)
         db.session.commit()
         print("Session record updated successfully.")
-    except Exception as e:
-        print("Error updating session record:", e)
-        return jsonify({"error": f"Error updating session record: {str(e)}"}), 500
 
-    return jsonify({"message": "Audio uploaded, processed, and transcribed successfully"}), 200
+    # Queued by duration, so short dictations don't wait behind long consults
+    job = schedule_transcription(session_id, mp3_path, transcribe_job, current_app._get_current_object())
+    if request.args.get("async") == "1":
+        return jsonify({"message": "Audio uploaded, transcription queued", **job_status(job)}), 202
+
+    job.wait()
+    if job.status == "error":
+        return jsonify({"error": f"Error during transcription: {job.error}"}), 500
+    return jsonify({"message": "Audio uploaded, processed, and transcribed successfully", **job_status(job)}), 200
 
 
 # -------------------------------------------------------------------
@@ -249,6 +293,21 @@ def list_templates():
         })
     return jsonify(results), 200
 
+@routes_blueprint.route("/templates/<int:template_id>", methods=["GET"])
+def get_template(template_id):
+    """Get a single template, including its text (the overview index omits it)."""
+    t = Template.query.get(template_id)
+    if not t:
+        return jsonify({"error": "Template not found"}), 404
+    return jsonify({
+        "template_id": t.template_id,
+        "template_name": t.template_name,
+        "template_text": t.template_text,
+        "times_used": t.times_used,
+        "created_at": t.created_at.isoformat(),
+        "favorite": t.favorite
+    }), 200
+
 # -------------------------------------------------------------------
 # INTERPRETATIONS ROUTES
 # -------------------------------------------------------------------
@@ -265,13 +324,18 @@ def create_interpretation_record():
         return jsonify({"error": "Missing session_id or template_id"}), 400
 
     try:
-        interpretation = generate_interpretation(session_id, template_id)
+        interpretation = generate_interpretation(
+            session_id, template_id, parallel_sections=data.get("parallel_sections"))
         return jsonify({
             "interpretation_id": interpretation.interpretation_id,
             "generated_text": interpretation.generated_text,
             "session_id": interpretation.session_id,
             "template_id": interpretation.template_id,
-            "created_at": interpretation.created_at.isoformat()
+            "created_at": interpretation.created_at.isoformat(),
+            "model_used": interpretation.model_used,
+            "input_tokens": interpretation.input_tokens,
+            "output_tokens": interpretation.output_tokens,
+            "latency_ms": interpretation.latency_ms
         }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -294,10 +358,19 @@ def list_interpretations():
             "session_id": i.session_id,
             "template_id": i.template_id,
             "generated_text": i.generated_text,
-            "created_at": i.created_at.isoformat()
+            "created_at": i.created_at.isoformat(),
+            "model_used": i.model_used,
+            "input_tokens": i.input_tokens,
+            "output_tokens": i.output_tokens,
+            "latency_ms": i.latency_ms
         })
     return jsonify(results), 200
 
+@routes_blueprint.route("/interpretations/usage", methods=["GET"])
+def interpretation_usage():
+    """Aggregate LLM token usage and latency."""
+    return jsonify(usage_summary()), 200
+
 # routes.py (add these imports at the top if needed)
 
 @routes_blueprint.route("/sessions/<int:session_id>/chunks", methods=["POST"])
@@ -317,17 +390,20 @@ def upload_chunk(session_id):
     if not file.filename:
         return jsonify({"error": "Empty filename"}), 400
 
-    # Generate a unique chunk filename
-    chunk_filename = f"chunk_{uuid.uuid4()}.mp3"
-    temp_dir = os.path.join(config.AUDIO_UPLOAD_FOLDER, "temp_chunks", f"session_{session_id}")
-    os.makedirs(temp_dir, exist_ok=True)
-
-    saved_path = os.path.join(temp_dir, chunk_filename)
+    # Named after the client's chunk_id (if any), so a frame that already
+    # arrived over the live socket is not stored twice
+    chunk_filename = live_transcribe.chunk_filename(request.form.get("chunk_id"))
     try:
-        file.save(saved_path)
+        stored = live_transcribe.store_chunk(session_id, chunk_filename, file.save)
     except Exception as e:
         return jsonify({"error": f"Error saving chunk: {str(e)}"}), 500
 
+    if not stored:
+        return jsonify({
+            "message": "Chunk already uploaded",
+            "chunk_filename": chunk_filename
+        }), 200
+
     return jsonify({
         "message": "Partial chunk uploaded",
         "chunk_filename": chunk_filename
@@ -343,16 +419,42 @@ def merge_chunks(session_id):
     if not s:
         return jsonify({"error": "Session not found"}), 404
 
-    temp_dir = os.path.join(config.AUDIO_UPLOAD_FOLDER, "temp_chunks", f"session_{session_id}")
+    temp_dir = live_transcribe.chunk_dir(session_id)
     if not os.path.exists(temp_dir):
+        # Nothing on disk to match any live state left behind
+        live_transcribe.discard(session_id)
+        # A retry of a merge that already completed: answer the same way
+        if s.transcription_text:
+            return jsonify({"message": "Chunks already merged and transcribed"}), 200
         return jsonify({"error": "No partial chunks found"}), 400
 
     chunks = [f for f in os.listdir(temp_dir) if f.endswith(".mp3")]
     if not chunks:
+        live_transcribe.discard(session_id)
         return jsonify({"error": "No chunk files found"}), 400
 
     chunks.sort(key=lambda f: os.path.getctime(os.path.join(temp_dir, f)))
 
+    # If the chunks were streamed live over Socket.IO, most of the transcript
+    # already exists; only the last open window still needs transcribing.
+    try:
+        live_text = live_transcribe.finalise(session_id, expected_frames=len(chunks))
+    except Exception as e:
+        print(f"Live transcript finalise failed, falling back: {e}")
+        live_text = None
+
+    if live_text is not None:
+        save_transcription(s, live_text)
+        if s.session_title.strip().lower() == "untitled session" and s.transcription_text:
+            from services import generate_short_title
+            s.session_title = generate_short_title(s.transcription_text)
+            db.session.commit()
+        try:
+            shutil.rmtree(temp_dir)
+        except Exception as e:
+            print(f"Warning: could not delete temp dir {temp_dir}: {e}")
+        return jsonify({"message": "Live transcript finalised and audio deleted"}), 200
+
     final_mp3 = os.path.join(config.AUDIO_UPLOAD_FOLDER, f"session_{session_id}_merged.mp3")
 
     if len(chunks) == 1:
@@ -362,30 +464,65 @@ def merge_chunks(session_id):
         with open(list_txt, "w") as f:
             for c in chunks:
                 f.write(f"file '{os.path.join(temp_dir, c)}'\n")
-        subprocess.run([
+        run_ffmpeg([
             "ffmpeg", "-y", "-f", "concat", "-safe", "0",
             "-i", list_txt, "-c", "copy", final_mp3
-        ], check=True)
+        ])
 
-    # --- Transcribe & delete audio ---
-    try:
+    def transcribe_job():
+        s = Session.query.get(session_id)
+        # --- Transcribe & delete audio ---
         transcribe_audio_file(final_mp3, s)   # this removes final_mp3 itself
-    except Exception as e:
-        return jsonify({"error": f"Transcription error: {e}"}), 500
 
-    # auto-title if still default
-    if s.session_title.strip().lower() == "untitled session" and s.transcription_text:
-        from services import generate_short_title
-        s.session_title = generate_short_title(s.transcription_text)
-        db.session.commit()
+        # auto-title if still default
+        if s.session_title.strip().lower() == "untitled session" and s.transcription_text:
+            from services import generate_short_title
+            s.session_title = generate_short_title(s.transcription_text)
+            db.session.commit()
+
+        # remove temp chunk directory
+        try:
+            shutil.rmtree(temp_dir)
+        except Exception as e:
+            print(f"Warning: could not delete temp dir {temp_dir}: {e}")
+
+    job = schedule_transcription(session_id, final_mp3, transcribe_job, current_app._get_current_object())
+    if request.args.get("async") == "1":
+        return jsonify({"message": "Chunks merged, transcription queued", **job_status(job)}), 202
+
+    job.wait()
+    if job.status == "error":
+        return jsonify({"error": f"Transcription error: {job.error}"}), 500
+    return jsonify({"message": "Chunks merged, transcribed, and audio deleted", **job_status(job)}), 200
 
-    # remove temp chunk directory
-    try:
-        shutil.rmtree(temp_dir)
-    except Exception as e:
-        print(f"Warning: could not delete temp dir {temp_dir}: {e}")
 
-    return jsonify({"message": "Chunks merged, transcribed, and audio deleted"}), 200
+@routes_blueprint.route("/sessions/<int:session_id>/transcription-status", methods=["GET"])
+def transcription_status(session_id):
+    """Status and ETA of the latest transcription job for a session."""
+    job = SESSION_JOBS.get(session_id)
+    if job is not None:
+        return jsonify(job_status(job)), 200
+
+    # Not queued in this worker: answer from the database
+    s = Session.query.get(session_id)
+    if not s:
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify({
+        "session_id": session_id,
+        "status": "done" if s.transcription_text else TRANSCRIPTION_STATUS.get(session_id, "none"),
+        "eta_seconds": 0,
+    }), 200
+
+
+def start_section_regeneration(app, template_id):
+    def do_regeneration():
+        with app.app_context():
+            try:
+                regenerate_changed_sections(template_id)
+            except Exception as e:
+                print(f"Error regenerating sections for template {template_id}:", e)
+
+    threading.Thread(target=do_regeneration, daemon=True).start()
 
 
 @routes_blueprint.route("/templates/<int:template_id>", methods=["PUT"])
@@ -403,10 +540,15 @@ def update_template(template_id):
     if not new_name or not new_text:
         return jsonify({"error": "template_name or template_text missing"}), 400
 
+    text_changed = t.template_text != new_text
     t.template_name = new_name
     t.template_text = new_text
     db.session.commit()
 
+    # Bring section-generated notes up to date; only edited sections are redone
+    if text_changed:
+        start_section_regeneration(current_app._get_current_object(), template_id)
+
     return jsonify({
         "template_id": t.template_id,
         "template_name": t.template_name,
@@ -1,3 +1,6 @@
+import green
+green.monkey_patch()  # before anything else imports socket / psycopg2
+
 from app import create_app, socketio
 
 app = create_app()
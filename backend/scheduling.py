@@ -0,0 +1,14 @@
+# scheduling.py
+"""
+Queue policy for transcription jobs (used by transcribe_async.py and
+simulate_scheduling.py). Jobs need .duration and .submitted_at.
+"""
+
+
+def job_priority(job, now, aging_factor):
+    """Shortest job first, with aging. Lower runs first."""
+    return job.duration - aging_factor * (now - job.submitted_at)
+
+
+def pick_next(jobs, now, aging_factor):
+    return min(jobs, key=lambda j: job_priority(j, now, aging_factor))
@@ -1,13 +1,124 @@
 # services.py
 import os
+import shutil
+import tempfile
 import openai
 from models import db, Session, Template, Interpretation
 import config
 import json
+import re
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import model_router
+import audio_cache
+import replicas
+from green import run_blocking, run_ffmpeg
+from tokens import count_tokens, count_message_tokens, truncate_to_tokens
 
 openai.api_key = config.OPENAI_API_KEY
 
+# Transcripts (and the audio-fingerprint cache) are kept this long
+TRANSCRIPTION_TTL = timedelta(hours=24)
+
+# Whisper rejects files over 25 MB. Larger recordings are re-encoded as
+# 64 kbit/s mono in 20-minute segments (~9.6 MB each) and sent one by one.
+WHISPER_MAX_BYTES = 24 * 1024 * 1024
+WHISPER_SEGMENT_SECONDS = 20 * 60
+
+
+
+# -------------------------------------------------------------------
+# PROMPTS
+# Stable instructions (and template text) go first so the provider can
+# reuse the cached prompt prefix; the transcript is always the last,
+# variable part of the request.
+# -------------------------------------------------------------------
+
+TITLE_INSTRUCTIONS = """You are in the backend of a medical scribe webapp. You will be given a session transcription.
+
+Generate a short title for this session that is no longer than 20 characters. 
+Words must fit inside the 20 characters, not cutting words at the end. 
+Do not unnecessarily capitalise the first letter of every word, unless its the first word in the whole title, or the word has to have capital letters.
+Output your answer strictly in JSON format with a single key "title", for example:
+{"title": "Your title"}. VERY IMPORTANT: Return only pure JSON, no other text, no other symbols, nothing else other than pure json. Your returned reply needs to be correctly read as json by a python script and it must contain absolutely nothing else other than the json requested."""
+
+INTERPRETATION_INSTRUCTIONS = """You are a clinical scribe. 
+You will be given the transcription of a clinician's session, 
+and you will return a formatted session note according to this note template:
+TEMPLATE:
+'''{template_text}'''
+"""
+
+SECTION_INSTRUCTIONS = """Write ONLY the following part of the note, keeping its heading (if it has one) and layout exactly as they appear in the template. Do not write any other part.
+SECTION:
+'''{section_text}'''"""
+
+# In-memory usage totals for calls that are not stored on an Interpretation
+# e.g. LLM_USAGE["title"] = {"calls": 3, "input_tokens": ..., ...}
+LLM_USAGE = {}
+
+def _record_usage(task, usage):
+    totals = LLM_USAGE.setdefault(task, {
+        "calls": 0, "input_tokens": 0, "output_tokens": 0, "latency_ms": 0,
+    })
+    totals["calls"] += 1
+    for key in ("input_tokens", "output_tokens", "latency_ms"):
+        totals[key] += usage[key]
+
+# Swappable for a local fake (anything with a ChatCompletion-style .create)
+CHAT_BACKEND = openai.ChatCompletion
+
+def chat_completion(task, messages, **kwargs):
+    """
+    Call ChatCompletion with the model profile for `task` and return
+    (content, usage), where usage holds the model, input/output token counts
+    and latency of the call. Token counts come from the provider; they are
+    only counted locally when it does not report them. If the chosen model errors, the
+    call is retried once on the task's fallback model.
+    """
+    model, profile = model_router.choose_model(task)
+    if profile["json"]:
+        kwargs.setdefault("response_format", {"type": "json_object"})
+
+    try:
+        return _timed_chat(task, model, messages, **kwargs)
+    except Exception as e:
+        fallback = model_router.fallback_after_error(task, model, e)
+        if not fallback:
+            raise
+        print(f"{task} call on {model} failed ({e}); retrying on {fallback}")
+        return _timed_chat(task, fallback, messages, **kwargs)
+
+def _timed_chat(task, model, messages, **kwargs):
+    started = time.monotonic()
+    try:
+        response = CHAT_BACKEND.create(model=model, messages=messages, **kwargs)
+    except Exception:
+        model_router.record_failure(task, model, int((time.monotonic() - started) * 1000))
+        raise
+    latency_ms = int((time.monotonic() - started) * 1000)
+    model_router.record_latency(model, latency_ms)
+
+    content = response.choices[0].message["content"].strip()
+    reported = response.get("usage") or {}
+    input_tokens = reported.get("prompt_tokens")
+    if input_tokens is None:
+        # Tokenising the whole transcript is CPU-bound; keep it off the event loop
+        input_tokens = run_blocking(count_message_tokens, messages, model)
+    output_tokens = reported.get("completion_tokens")
+    if output_tokens is None:
+        output_tokens = run_blocking(count_tokens, content, model)
+    usage = {
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "latency_ms": latency_ms,
+    }
+    _record_usage(task, usage)
+    return content, usage
 
 
 def generate_short_title(transcription_text):
@@ -15,36 +126,25 @@ def generate_short_title(transcription_text):
     Given a session transcription, use ChatGPT (GPT-4) to generate a short title.
     The title must be no longer than 20 characters.
     The response must be a JSON with a single key "title".
+    Only the opening TITLE_MAX_INPUT_TOKENS of the transcript are sent.
     """
-
-    prompt = f"""You are in the backend of a medical scribe webapp. This is the session transcription: 
-    <transcription>{transcription_text}</transcription>.
-
-    Generate a short title for this session that is no longer than 20 characters. 
-    Words must fit inside the 20 characters, not cutting words at the end. 
-    Do not unnecessarily capitalise the first letter of every word, unless its the first word in the whole title, or the word has to have capital letters.
-    Output your answer strictly in JSON format with a single key "title", for example:
-    {{"title": "Your title"}}. VERY IMPORTANT: Return only pure JSON, no other text, no other symbols, nothing else other than pure json. Your returned reply needs to be correctly read as json by a python script and it must contain absolutely nothing else other than the json requested."""
-    print('tra---', transcription_text)
+    excerpt = run_blocking(truncate_to_tokens, transcription_text, config.TITLE_MAX_INPUT_TOKENS)
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a concise assistant."},
-                {"role": "user", "content": prompt}
+        message_content, usage = chat_completion(
+            "title",
+            [
+                {"role": "system", "content": TITLE_INSTRUCTIONS},
+                {"role": "user", "content": f"<transcription>{excerpt}</transcription>"}
             ],
             temperature=0.5,
             max_tokens=30,
         )
-        # Extract the message content
-        print('res---', response)
-        message_content = response.choices[0].message['content']
-        # Parse the response as JSON
-        print('mes---', message_content)
+        # JSON mode guarantees an object, but not its keys
         result = json.loads(message_content)
-        print('res2---', result)
-        title = result.get("title", "").strip()[:22]
-        print('title---', title)
+        title = str(result.get("title") or "").strip()[:22]
+        if not title:
+            return "Untitled session"
+        print(f"title--- {title} ({usage['input_tokens']} in / {usage['output_tokens']} out, {usage['latency_ms']} ms)")
         return title
     except Exception as e:
         print("Error generating short title:", e)
@@ -55,32 +155,321 @@ def transcribe_audio_file(mp3_path: str, session: Session):
     """
     Transcribe the given MP3 with Whisper, save the text to the session,
     then delete the audio file from disk and clear session.audio_file_path.
+    Audio that was already transcribed for this session, or is being
+    transcribed right now (e.g. a client retry after a timeout), reuses that
+    transcript instead of calling Whisper again.
     """
     if not mp3_path or not os.path.exists(mp3_path):
         raise FileNotFoundError("Audio file path is invalid or does not exist.")
 
-    # --- Whisper ---
-    with open(mp3_path, "rb") as audio_file:
-        response = openai.Audio.transcribe("whisper-1", audio_file)
+    audio_hash = audio_cache.fingerprint(mp3_path)
+    # A retry of the same audio waits here for the first request's transcript
+    with audio_cache.in_flight(audio_hash, session.session_id):
+        cached = audio_cache.get_transcript(audio_hash, session.session_id)
+        if cached is not None:
+            print(f"Reusing cached transcript for audio {audio_hash[:12]} (session {session.session_id})")
+            # Keep the original expiry: the text must not outlive its first 24h
+            save_transcription(session, cached.transcription_text, mp3_path, cached.expires_at)
+            return
+
+        # --- Whisper ---
+        text = whisper_transcribe(mp3_path)
+
+        save_transcription(session, text, mp3_path)
+        audio_cache.put_transcript(audio_hash, session.session_id, text, session.transcription_expires_at)
+
+# Seconds the current thread (green thread under eventlet) spent in Whisper;
+# the transcription scheduler learns its speed from these alone
+_WHISPER_TIME = threading.local()
+
+def take_whisper_seconds() -> float:
+    """Seconds this thread spent in Whisper since the last call (0 if none)."""
+    seconds = getattr(_WHISPER_TIME, "seconds", 0.0)
+    _WHISPER_TIME.seconds = 0.0
+    return seconds
+
+def whisper_transcribe(mp3_path: str) -> str:
+    """
+    Whisper text for an MP3 of any length. Files over WHISPER_MAX_BYTES are
+    split into WHISPER_SEGMENT_SECONDS segments, transcribed in order (each
+    prompted with the end of the previous text) and joined.
+    """
+    started = time.monotonic()
+    try:
+        return _whisper_transcribe(mp3_path)
+    finally:
+        _WHISPER_TIME.seconds = getattr(_WHISPER_TIME, "seconds", 0.0) + time.monotonic() - started
 
+def _whisper_transcribe(mp3_path):
+    if os.path.getsize(mp3_path) <= WHISPER_MAX_BYTES:
+        with open(mp3_path, "rb") as audio_file:
+            return openai.Audio.transcribe("whisper-1", audio_file)["text"]
+
+    segment_dir = tempfile.mkdtemp(prefix="whisper_", dir=os.path.dirname(mp3_path))
+    try:
+        run_ffmpeg([
+            "ffmpeg", "-y", "-v", "error", "-i", mp3_path,
+            "-vn", "-ac", "1", "-b:a", "64k",
+            "-f", "segment", "-segment_time", str(WHISPER_SEGMENT_SECONDS),
+            os.path.join(segment_dir, "part_%03d.mp3"),
+        ])
+        texts = []
+        for name in sorted(os.listdir(segment_dir)):
+            # The tail of the previous segment keeps names and spelling consistent
+            prompt = texts[-1][-200:] if texts else None
+            with open(os.path.join(segment_dir, name), "rb") as audio_file:
+                if prompt:
+                    response = openai.Audio.transcribe("whisper-1", audio_file, prompt=prompt)
+                else:
+                    response = openai.Audio.transcribe("whisper-1", audio_file)
+            texts.append(response["text"].strip())
+        print(f"Transcribed {mp3_path} in {len(texts)} segments.")
+        return " ".join(t for t in texts if t)
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+def save_transcription(session: Session, text: str, mp3_path: str = None, expires_at: datetime = None):
+    """
+    Save transcript text on the session with the usual 24h expiry (unless
+    expires_at is given), delete the audio file (if any) and clear
+    session.audio_file_path.
+    """
     # --- Save transcript ---
-    session.transcription_text = response["text"]
-    session.transcription_expires_at = datetime.utcnow() + timedelta(hours=24)
+    session.transcription_text = text
+    session.transcription_expires_at = expires_at or datetime.utcnow() + TRANSCRIPTION_TTL
 
     # --- Remove audio ---
-    try:
-        os.remove(mp3_path)
-    except Exception as e:
-        print(f"Warning: could not delete {mp3_path}: {e}")
+    if mp3_path:
+        try:
+            os.remove(mp3_path)
+        except Exception as e:
+            print(f"Warning: could not delete {mp3_path}: {e}")
 
     session.audio_file_path = None
     db.session.commit()
 
-def generate_interpretation(session_id: int, template_id: int) -> Interpretation:
+def _fit_transcript(transcript, instructions):
+    """
+    Apply the input-token caps to a transcript. With OVERSIZE_POLICY
+    "truncate" the transcript is cut to INTERPRETATION_MAX_INPUT_TOKENS;
+    with "route" it is kept whole (the caller switches to the
+    long_transcript profile) and only cut to that profile's own cap.
+    """
+    if config.OVERSIZE_POLICY == "truncate":
+        budget = config.INTERPRETATION_MAX_INPUT_TOKENS
+    else:
+        budget = config.LONG_TRANSCRIPT_MAX_INPUT_TOKENS
+    budget -= count_tokens(instructions)
+    fitted = truncate_to_tokens(transcript, max(budget, 0))
+    if fitted != transcript:
+        print(f"Transcript truncated to {budget} tokens ({config.OVERSIZE_POLICY} policy).")
+    return fitted
+
+def usage_summary():
+    """Aggregate token and latency totals across all recorded LLM calls."""
+    row = db.session.query(
+        db.func.count(Interpretation.interpretation_id),
+        db.func.coalesce(db.func.sum(Interpretation.input_tokens), 0),
+        db.func.coalesce(db.func.sum(Interpretation.output_tokens), 0),
+        db.func.coalesce(db.func.avg(Interpretation.latency_ms), 0),
+    ).filter(Interpretation.input_tokens.isnot(None)).one()
+
+    by_model = db.session.query(
+        Interpretation.model_used,
+        db.func.count(Interpretation.interpretation_id),
+        db.func.sum(Interpretation.input_tokens),
+        db.func.sum(Interpretation.output_tokens),
+    ).filter(Interpretation.input_tokens.isnot(None)).group_by(Interpretation.model_used).all()
+
+    return {
+        "interpretations": {
+            "count": row[0],
+            "input_tokens": int(row[1]),
+            "output_tokens": int(row[2]),
+            "avg_latency_ms": int(row[3]),
+            "by_model": [
+                {"model": m, "count": c, "input_tokens": int(i or 0), "output_tokens": int(o or 0)}
+                for m, c, i, o in by_model
+            ],
+        },
+        # since process start, per task (title, interpretation, ...)
+        "calls": LLM_USAGE,
+        "routing": model_router.routing_summary(),
+    }
+
+# -------------------------------------------------------------------
+# SECTION-PARALLEL GENERATION
+# Long templates are split on their markdown headings and each section is generated
+# by its own call, concurrently, against the same transcript. The shared
+# (instructions + template + transcript) prefix is identical across the
+# section calls; only the short section instruction differs.
+# -------------------------------------------------------------------
+
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+\S")
+
+def split_template_sections(template_text):
+    """
+    Split template text into its top-level markdown sections, in order, as a
+    list of {"heading", "text", "hash"}. The top level is the shallowest
+    heading level used more than once, so a lone "# Title" does not swallow
+    the whole note, and deeper headings and "Label:" lines stay inside their
+    section. Text before the first heading (e.g. identifying fields) is kept
+    as a leading section with an empty heading. Templates with fewer than
+    two top-level headings have nothing to split and give [].
+    """
+    lines = (template_text or "").splitlines()
+    levels = [len(m.group(1)) for m in (_MARKDOWN_HEADING.match(line.strip()) for line in lines) if m]
+    repeated = [level for level in set(levels) if levels.count(level) > 1]
+    if not repeated:
+        return []
+    top = min(repeated)
+
+    sections = [{"heading": "", "lines": []}]
+    for line in lines:
+        match = _MARKDOWN_HEADING.match(line.strip())
+        if match and len(match.group(1)) == top:
+            sections.append({"heading": line.strip().lstrip("#").strip(), "lines": [line]})
+        else:
+            sections[-1]["lines"].append(line)
+
+    result = []
+    for sec in sections:
+        text = "\n".join(sec["lines"]).strip()
+        if not text:
+            continue
+        result.append({
+            "heading": sec["heading"],
+            "text": text,
+            "hash": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+        })
+    return result
+
+def generate_sections(task, instructions, transcript, sections):
+    """
+    Generate `sections` concurrently. Returns (texts, usage) with texts in
+    the same order as `sections` and usage summed over all section calls
+    (latency is wall-clock for the whole batch).
+    """
+    base_messages = [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": f"TRANSCRIPTION:\n'''{transcript}'''"},
+    ]
+
+    def one(section):
+        return chat_completion(task, base_messages + [
+            {"role": "user", "content": SECTION_INSTRUCTIONS.format(section_text=section["text"])}
+        ])
+
+    started = time.monotonic()
+    workers = max(1, min(config.SECTION_PARALLEL_WORKERS, len(sections)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(one, sections))
+    wall_ms = int((time.monotonic() - started) * 1000)
+
+    texts = [content for content, _ in results]
+    models = sorted({u["model"] for _, u in results})
+    usage = {
+        "model": ",".join(models)[:64],
+        "input_tokens": sum(u["input_tokens"] for _, u in results),
+        "output_tokens": sum(u["output_tokens"] for _, u in results),
+        "latency_ms": wall_ms,
+    }
+    return texts, usage
+
+def _sections_json(sections, texts):
+    return json.dumps([
+        {"heading": sec["heading"], "hash": sec["hash"], "text": text}
+        for sec, text in zip(sections, texts)
+    ])
+
+# One regeneration per template at a time (in this process); see below
+_REGEN_LOCKS = {}
+_regen_locks_lock = threading.Lock()
+
+def _template_text_now(template_id):
+    """The template's committed text, bypassing the session's identity map."""
+    return db.session.query(Template.template_text).filter(
+        Template.template_id == template_id).scalar()
+
+def regenerate_changed_sections(template_id: int):
+    """
+    After a template edit, bring existing section-generated notes for it up
+    to date: unchanged sections are reused, only new or edited sections are
+    regenerated, and removed sections are dropped.
+    Runs are serialised per template and always work from the latest text.
+    If the template is edited again mid-run, the run stops (without writing
+    the note it was on) and the next edit's run carries on from there.
+    """
+    with _regen_locks_lock:
+        lock = _REGEN_LOCKS.setdefault(template_id, threading.Lock())
+    with lock:
+        _regenerate_changed_sections(template_id)
+
+def _regenerate_changed_sections(template_id):
+    template_text = _template_text_now(template_id)
+    sections = split_template_sections(template_text)
+    if not sections:
+        return
+
+    interpretations = Interpretation.query.filter(
+        Interpretation.template_id == template_id,
+        Interpretation.sections_json.isnot(None),
+    ).all()
+
+    for interp in interpretations:
+        previous = {s["hash"]: s["text"] for s in json.loads(interp.sections_json)}
+        changed = [sec for sec in sections if sec["hash"] not in previous]
+        if not changed and len(previous) == len(sections):
+            continue
+
+        transcript = interp.session.transcription_text
+        if changed and not transcript:
+            print(f"Interpretation {interp.interpretation_id}: transcript expired, not regenerating.")
+            continue
+
+        fresh = {}
+        if changed:
+            if _template_text_now(template_id) != template_text:
+                print(f"Template {template_id} edited again; leaving the rest to the newer run.")
+                return
+            task, instructions, transcript = run_blocking(
+                _prepare_interpretation_prompt, transcript, template_text)
+            texts, usage = generate_sections(task, instructions, transcript, changed)
+            fresh = {sec["hash"]: text for sec, text in zip(changed, texts)}
+            interp.input_tokens = (interp.input_tokens or 0) + usage["input_tokens"]
+            interp.output_tokens = (interp.output_tokens or 0) + usage["output_tokens"]
+
+        # Sections generated from an outdated template must not land
+        if _template_text_now(template_id) != template_text:
+            db.session.rollback()
+            print(f"Template {template_id} edited again; leaving the rest to the newer run.")
+            return
+
+        texts = [previous.get(sec["hash"], fresh.get(sec["hash"], "")) for sec in sections]
+        interp.generated_text = "\n\n".join(texts)
+        interp.sections_json = _sections_json(sections, texts)
+        db.session.commit()
+        replicas.mark_session_written(interp.session_id)
+        print(f"Interpretation {interp.interpretation_id}: regenerated {len(changed)}/{len(sections)} sections.")
+
+def _prepare_interpretation_prompt(transcript, template_text):
+    """Return (task, instructions, transcript) with the token caps applied."""
+    task = "interpretation"
+    instructions = INTERPRETATION_INSTRUCTIONS.format(template_text=template_text)
+    transcript = _fit_transcript(transcript, instructions)
+    if count_tokens(instructions) + count_tokens(transcript) > config.INTERPRETATION_MAX_INPUT_TOKENS:
+        task = "long_transcript"
+    return task, instructions, transcript
+
+def generate_interpretation(session_id: int, template_id: int, parallel_sections: bool = None) -> Interpretation:
     """
     Takes a session_id and template_id, fetches the objects,
     calls GPT to generate text, saves the Interpretation in the database,
     and returns the created Interpretation.
+    With parallel_sections each top-level section of the template is
+    generated concurrently and the note is reassembled in order. It is off
+    by default; SECTION_PARALLEL_MIN_SECTIONS > 0 turns it on for templates
+    with at least that many headed sections.
     """
     session_obj = Session.query.get(session_id)
     template_obj = Template.query.get(template_id)
@@ -90,31 +479,42 @@ def generate_interpretation(session_id: int, template_id: int) -> Interpretation
     if not session_obj.transcription_text:
         raise ValueError("No transcription available for this session.")
     
-    # Build the prompt using the template and transcription
-    prompt_text = f"""You are a clinical scribe. 
-    You will take this transcription of a clinician's session: 
-    TRANSCRIPTION:
-    '''{session_obj.transcription_text}'''
-    and you will return a formatted session note according to this note template:
-    TEMPLATE:
-    '''{template_obj.template_text}'''
-    """
-    
-    # Call OpenAI ChatCompletion
-    response = openai.ChatCompletion.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt_text}]
-    )
-    generated = response.choices[0].message.content.strip()
+    # Stable prefix (instructions + template), variable suffix (transcript)
+    # Tokenising a long transcript is CPU-bound; keep it off the event loop
+    task, instructions, transcript = run_blocking(
+        _prepare_interpretation_prompt, session_obj.transcription_text, template_obj.template_text)
+
+    sections = split_template_sections(template_obj.template_text)
+    if parallel_sections is None:
+        headed = sum(1 for sec in sections if sec["heading"])
+        parallel_sections = 0 < config.SECTION_PARALLEL_MIN_SECTIONS <= headed
+
+    sections_json = None
+    if parallel_sections and len(sections) > 1:
+        texts, usage = generate_sections(task, instructions, transcript, sections)
+        generated = "\n\n".join(texts)
+        sections_json = _sections_json(sections, texts)
+    else:
+        generated, usage = chat_completion(
+            task,
+            [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": f"TRANSCRIPTION:\n'''{transcript}'''"}
+            ]
+        )
     
     # Create the Interpretation record
     interpretation = Interpretation(
         session_id=session_obj.session_id,
         template_id=template_obj.template_id,
-        generated_text=generated
+        generated_text=generated,
+        model_used=usage["model"],
+        input_tokens=usage["input_tokens"],
+        output_tokens=usage["output_tokens"],
+        latency_ms=usage["latency_ms"],
+        sections_json=sections_json,
     )
     db.session.add(interpretation)
-    print(generated)
     
     # Increment times_used for the template
     template_obj.times_used += 1
@@ -0,0 +1,33 @@
+# tests/conftest.py
+import pytest
+
+from testapp import make_app
+import config
+import tokens
+from models import db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AUDIO_UPLOAD_FOLDER", str(tmp_path / "audio"))
+    app = make_app(f"sqlite:///{tmp_path / 'primary.db'}", replica_uris=[])
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """tiktoken whose BPE download fails, as on a host without internet."""
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("openaipublic.blob.core.windows.net unreachable")
+
+    monkeypatch.setattr(tokens, "_ENCODINGS", {})
+    monkeypatch.setattr(tokens, "_FAILED_AT", {})
+    monkeypatch.setattr(tokens.tiktoken, "encoding_for_model", unreachable)
+    monkeypatch.setattr(tokens.tiktoken, "get_encoding", unreachable)
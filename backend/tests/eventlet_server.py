@@ -0,0 +1,32 @@
+# tests/eventlet_server.py
+"""
+Serve the test app from a single eventlet worker, the way wsgi.py runs in
+production. Prints the port on stdout once listening.
+
+    python tests/eventlet_server.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import green  # noqa: E402
+green.monkey_patch()
+
+import eventlet  # noqa: E402
+import eventlet.wsgi  # noqa: E402
+import openai  # noqa: E402
+
+from testapp import make_app  # noqa: E402
+from models import db, Session  # noqa: E402
+
+# Whisper/ChatGPT calls fail fast instead of leaving the machine
+openai.api_base = "http://127.0.0.1:9/v1"
+
+app = make_app()
+with app.app_context():
+    db.session.add(Session(session_title="Untitled session"))
+    db.session.commit()
+
+sock = eventlet.listen(("127.0.0.1", 0))
+print(sock.getsockname()[1], flush=True)
+eventlet.wsgi.server(sock, app, log_output=False)
@@ -0,0 +1,81 @@
+# tests/test_audio_cache.py
+import threading
+import time
+
+import openai
+import pytest
+
+import audio_cache
+import services
+from models import db, Session, TranscriptCache
+
+RECORDING = b"\xff\xfb same recording" * 100
+
+
+@pytest.fixture
+def whisper_calls(monkeypatch):
+    calls = []
+
+    def whisper(model, audio_file, **kwargs):
+        calls.append(model)
+        time.sleep(0.5)  # the client times out and retries meanwhile
+        return {"text": "patient reports better sleep"}
+
+    monkeypatch.setattr(openai.Audio, "transcribe", whisper)
+    # Hash the bytes; the test doesn't need ffmpeg
+    monkeypatch.setattr(audio_cache, "fingerprint", audio_cache._file_sha256)
+    return calls
+
+
+def _new_session(app):
+    with app.app_context():
+        s = Session(session_title="Untitled session")
+        db.session.add(s)
+        db.session.commit()
+        return s.session_id
+
+
+def _transcribe(app, tmp_path, name, session_id):
+    path = tmp_path / f"{name}.mp3"
+    path.write_bytes(RECORDING)
+    with app.app_context():
+        services.transcribe_audio_file(str(path), db.session.get(Session, session_id))
+
+
+def test_concurrent_retry_waits_for_the_first_transcription(app, tmp_path, whisper_calls):
+    session_id = _new_session(app)
+
+    threads = [threading.Thread(target=_transcribe, args=(app, tmp_path, f"upload_{i}", session_id))
+               for i in range(2)]
+    for t in threads:
+        t.start()
+        time.sleep(0.1)  # the retry arrives while the first call is running
+    for t in threads:
+        t.join(10)
+
+    assert whisper_calls == ["whisper-1"]
+    with app.app_context():
+        assert db.session.get(Session, session_id).transcription_text == "patient reports better sleep"
+    assert audio_cache._IN_FLIGHT == {}
+
+
+def test_other_sessions_do_not_get_the_cached_transcript(app, tmp_path, whisper_calls):
+    first, second = _new_session(app), _new_session(app)
+    _transcribe(app, tmp_path, "first", first)
+    _transcribe(app, tmp_path, "second", second)
+    assert whisper_calls == ["whisper-1"] * 2
+
+
+def test_deleting_the_session_deletes_its_cached_transcript(app, client, tmp_path, whisper_calls):
+    session_id = _new_session(app)
+    _transcribe(app, tmp_path, "upload", session_id)
+    with app.app_context():
+        assert TranscriptCache.query.filter_by(session_id=session_id).count() == 1
+
+    assert client.delete(f"/api/sessions/{session_id}").status_code == 200
+    with app.app_context():
+        assert TranscriptCache.query.count() == 0
+
+    # Re-uploading the same audio to a new session transcribes it afresh
+    _transcribe(app, tmp_path, "again", _new_session(app))
+    assert whisper_calls == ["whisper-1"] * 2
@@ -0,0 +1,132 @@
+# tests/test_green.py
+"""
+Under the eventlet worker, a slow upload (piped through ffmpeg) or a long
+run_ffmpeg() call must not hold up other requests on the same worker.
+
+ffmpeg is replaced on PATH by a script that sleeps before doing its work,
+so the tests neither need ffmpeg installed nor depend on its speed.
+"""
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FFMPEG_SECONDS = 2.0
+# /api/sessions on an idle worker takes a few ms; a blocked hub would
+# make it wait for the whole ffmpeg call
+MAX_LATENCY = 0.5
+
+FAKE_FFMPEG = """#!{python}
+import os, shutil, sys, time
+time.sleep(float(os.environ.get("FAKE_FFMPEG_SECONDS", "2")))
+out = sys.argv[-1]
+if "pipe:0" in sys.argv:
+    with open(out, "wb") as f:
+        shutil.copyfileobj(sys.stdin.buffer, f)
+elif out != "-":
+    open(out, "wb").close()
+"""
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("green")
+    bin_dir = tmp / "bin"
+    bin_dir.mkdir()
+    for name in ("ffmpeg", "ffprobe"):
+        script = bin_dir / name
+        script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+        script.chmod(0o755)
+
+    env = dict(os.environ,
+               PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+               DATABASE_URI=f"sqlite:///{tmp / 'scrib.db'}",
+               AUDIO_UPLOAD_FOLDER=str(tmp / "audio"),
+               FAKE_FFMPEG_SECONDS=str(FFMPEG_SECONDS),
+               PROFILE_ENABLED="0")
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "eventlet_server.py")],
+                            env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True)
+    port = proc.stdout.readline().strip()
+    if not port.isdigit():
+        proc.kill()
+        pytest.fail(f"eventlet test server did not start (stdout: {port!r})")
+    yield f"http://127.0.0.1:{port}"
+    proc.kill()
+    proc.wait()
+
+
+def _latencies_while(busy, base_url):
+    """GET /api/sessions repeatedly while `busy` (a thread) is running."""
+    latencies = []
+    while busy.is_alive():
+        started = time.monotonic()
+        resp = requests.get(f"{base_url}/api/sessions", timeout=10)
+        latencies.append(time.monotonic() - started)
+        assert resp.status_code == 200
+        time.sleep(0.05)
+    return latencies
+
+
+def test_slow_upload_does_not_block_session_list(server):
+    boundary = "testboundary"
+    head = (f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="consult.webm"\r\n'
+            "Content-Type: audio/webm\r\n\r\n").encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    pieces = [b"\0" * 32 * 1024] * 16
+
+    def body():
+        yield head
+        for piece in pieces:
+            time.sleep(0.1)  # a slow client
+            yield piece
+        yield tail
+
+    result = {}
+
+    def upload():
+        host, port = server.rsplit("/", 1)[1].split(":")
+        conn = http.client.HTTPConnection(host, int(port), timeout=30)
+        conn.request("POST", "/api/sessions/1/audio?async=1", body=body(), headers={
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(len(head) + sum(map(len, pieces)) + len(tail)),
+        })
+        result["status"] = conn.getresponse().status
+
+    busy = threading.Thread(target=upload)
+    busy.start()
+    latencies = _latencies_while(busy, server)
+    busy.join()
+
+    assert result["status"] == 202
+    assert len(latencies) >= 10  # the upload really overlapped the reads
+    assert max(latencies) < MAX_LATENCY, latencies
+
+
+def test_run_ffmpeg_does_not_block_session_list(server):
+    for _ in range(2):
+        resp = requests.post(f"{server}/api/sessions/1/chunks",
+                             files={"file": ("chunk.mp3", b"\xff\xfb" * 512, "audio/mpeg")})
+        assert resp.status_code == 200
+
+    result = {}
+
+    def merge():
+        # two chunks are joined with an ffmpeg concat via run_ffmpeg()
+        resp = requests.post(f"{server}/api/sessions/1/merge-chunks?async=1", timeout=30)
+        result["status"] = resp.status_code
+
+    busy = threading.Thread(target=merge)
+    busy.start()
+    latencies = _latencies_while(busy, server)
+    busy.join()
+
+    assert result["status"] == 202
+    assert len(latencies) >= 10
+    assert max(latencies) < MAX_LATENCY, latencies
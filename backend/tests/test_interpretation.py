@@ -0,0 +1,139 @@
+# tests/test_interpretation.py
+"""
+Prompt layout, usage accounting and the oversize policies of
+generate_interpretation(), against a local fake ChatCompletion backend.
+Token counts use the 4-characters-per-token estimate (see `offline`).
+"""
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import model_router
+import services
+from models import db, Session, Template
+
+TEMPLATE = "Subjective:\nObjective:\nPlan:"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class RecordingBackend:
+    """Answers after `seconds` of fake time and remembers every request."""
+
+    def __init__(self, clock, seconds=1.5):
+        self.clock = clock
+        self.seconds = seconds
+        self.requests = []
+
+    def create(self, model, messages, **kwargs):
+        self.requests.append({"model": model, "messages": messages})
+        self.clock.now += self.seconds
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message={"content": f" note by {model} "})],
+            get=lambda key, default=None: {"prompt_tokens": 1200, "completion_tokens": 300}
+            if key == "usage" else default,
+        )
+
+
+@pytest.fixture
+def backend(monkeypatch, offline):
+    clock = FakeClock()
+    fake = RecordingBackend(clock)
+    monkeypatch.setattr(services, "CHAT_BACKEND", fake)
+    monkeypatch.setattr(services, "time", clock)
+    monkeypatch.setattr(model_router, "time", clock)
+    monkeypatch.setattr(model_router, "MODEL_LATENCIES", {})
+    monkeypatch.setattr(model_router, "_degraded_calls", {})
+    monkeypatch.setattr(services, "LLM_USAGE", {})
+    return fake
+
+
+def _session(app, transcript):
+    with app.app_context():
+        s = Session(session_title="Consult", transcription_text=transcript)
+        t = Template(template_name="SOAP", template_text=TEMPLATE)
+        db.session.add_all([s, t])
+        db.session.commit()
+        return s.session_id, t.template_id
+
+
+def test_transcript_is_last_after_a_stable_system_prefix(app, backend):
+    first = _session(app, "first consult")
+    second = _session(app, "second consult")
+    with app.app_context():
+        services.generate_interpretation(*first)
+        services.generate_interpretation(*second)
+
+    a, b = (r["messages"] for r in backend.requests)
+    assert a[0] == {"role": "system", "content": services.INTERPRETATION_INSTRUCTIONS.format(template_text=TEMPLATE)}
+    assert a[0] == b[0]  # identical prefix, so the provider can cache it
+    assert a[-1] == {"role": "user", "content": "TRANSCRIPTION:\n'''first consult'''"}
+    assert b[-1]["content"].endswith("'''second consult'''")
+
+
+def test_model_tokens_and_latency_are_stored(app, backend):
+    ids = _session(app, "consult")
+    with app.app_context():
+        interp = services.generate_interpretation(*ids)
+        assert interp.generated_text == f"note by {config.INTERPRETATION_MODEL}"
+        assert interp.model_used == config.INTERPRETATION_MODEL
+        assert (interp.input_tokens, interp.output_tokens) == (1200, 300)
+        assert interp.latency_ms == 1500
+
+
+def test_usage_endpoint_aggregates_interpretations(app, client, backend):
+    ids = _session(app, "consult")
+    with app.app_context():
+        services.generate_interpretation(*ids)
+        backend.seconds = 2.5
+        services.generate_interpretation(*ids)
+
+    usage = client.get("/api/interpretations/usage").get_json()
+    assert usage["interpretations"]["count"] == 2
+    assert usage["interpretations"]["input_tokens"] == 2400
+    assert usage["interpretations"]["output_tokens"] == 600
+    assert usage["interpretations"]["avg_latency_ms"] == 2000
+    assert usage["interpretations"]["by_model"] == [{
+        "model": config.INTERPRETATION_MODEL, "count": 2, "input_tokens": 2400, "output_tokens": 600,
+    }]
+    assert usage["calls"]["interpretation"]["calls"] == 2
+
+
+@pytest.fixture
+def oversized(app, monkeypatch):
+    """A transcript of 1000 (estimated) tokens against a 300-token cap."""
+    monkeypatch.setattr(config, "INTERPRETATION_MAX_INPUT_TOKENS", 300)
+    monkeypatch.setattr(config, "LONG_TRANSCRIPT_MAX_INPUT_TOKENS", 5000)
+    return _session(app, "word " * 800)
+
+
+def test_truncate_policy_cuts_the_transcript(app, backend, oversized, monkeypatch):
+    monkeypatch.setattr(config, "OVERSIZE_POLICY", "truncate")
+    with app.app_context():
+        model_used = services.generate_interpretation(*oversized).model_used
+
+    request = backend.requests[0]
+    system, transcript = request["messages"][0]["content"], request["messages"][-1]["content"]
+    sent = transcript[len("TRANSCRIPTION:\n'''"):-len("'''")]
+    assert sent == ("word " * 800)[:len(sent)]
+    assert services.count_tokens(system) + services.count_tokens(sent) <= 300
+    assert model_used == config.INTERPRETATION_MODEL
+
+
+def test_route_policy_sends_the_whole_transcript_to_the_long_profile(app, backend, oversized, monkeypatch):
+    monkeypatch.setattr(config, "OVERSIZE_POLICY", "route")
+    with app.app_context():
+        model_used = services.generate_interpretation(*oversized).model_used
+
+    request = backend.requests[0]
+    assert request["messages"][-1]["content"] == "TRANSCRIPTION:\n'''" + "word " * 800 + "'''"
+    assert request["model"] == model_router.MODEL_PROFILES["long_transcript"]["primary"]
+    assert model_used == config.LONG_TRANSCRIPT_MODEL
+    assert "long_transcript" in services.LLM_USAGE
@@ -0,0 +1,97 @@
+# tests/test_live_transcribe.py
+import os
+import threading
+
+import pytest
+
+import live_transcribe
+from live_transcribe import LiveTranscript
+from models import db, Session
+
+
+@pytest.fixture
+def whisper(monkeypatch):
+    """Fake Whisper that blocks until released; returns the frames' bytes joined."""
+    state = {"release": threading.Event(), "started": threading.Event(), "calls": 0}
+
+    def transcribe(frames, prompt=None):
+        state["calls"] += 1
+        state["started"].set()
+        assert state["release"].wait(5)
+        return "+".join(audio.decode() for audio, _ in frames)
+
+    monkeypatch.setattr(live_transcribe, "_transcribe_frames", transcribe)
+    monkeypatch.setattr(live_transcribe.socketio, "emit", lambda *a, **kw: None)
+    return state
+
+
+def test_frames_are_accepted_while_a_window_is_transcribing(whisper):
+    live = LiveTranscript(1)
+    live.add_frame(b"a", 25)
+    worker = threading.Thread(target=live.process_window)
+    worker.start()
+    assert whisper["started"].wait(5)
+
+    # Whisper is still busy with "a"; this must not wait for it
+    added = threading.Thread(target=live.add_frame, args=(b"b", 5))
+    added.start()
+    added.join(1)
+    assert not added.is_alive()
+
+    whisper["release"].set()
+    worker.join(5)
+    # "a" closed the window; "b" arrived mid-call and opens the next one
+    assert live.segments == ["a"]
+    assert [audio for audio, _ in live.window] == [b"b"]
+    assert live.finalise() == "a b"
+
+
+def test_queued_tasks_without_new_frames_skip_whisper(whisper):
+    whisper["release"].set()
+    live = LiveTranscript(1)
+    live.add_frame(b"a", 5)
+    live.process_window()
+    live.process_window()
+    assert whisper["calls"] == 1
+
+
+def _session(app):
+    with app.app_context():
+        s = Session(session_title="Untitled session")
+        db.session.add(s)
+        db.session.commit()
+        return s.session_id
+
+
+def test_chunk_fallback_for_a_live_frame_is_stored_once(app, client):
+    session_id = _session(app)
+    chunk_id = "0f3c1b2a-live-frame"
+    filename = live_transcribe.chunk_filename(chunk_id)
+    # The socket path stored the frame, but its ack timed out on the client
+    assert live_transcribe.store_chunk(session_id, filename, lambda f: f.write(b"frame"))
+
+    resp = client.post(f"/api/sessions/{session_id}/chunks",
+                       data={"chunk_id": chunk_id, "file": (open(os.devnull, "rb"), "chunk.mp3")})
+    assert resp.status_code == 200
+    assert resp.get_json()["message"] == "Chunk already uploaded"
+    assert os.listdir(live_transcribe.chunk_dir(session_id)) == [filename]
+    with open(os.path.join(live_transcribe.chunk_dir(session_id), filename), "rb") as f:
+        assert f.read() == b"frame"
+
+
+def test_unsafe_chunk_ids_are_replaced():
+    assert live_transcribe.chunk_filename("../../etc/passwd") != "chunk_../../etc/passwd.mp3"
+    assert live_transcribe.chunk_filename(None).startswith("chunk_")
+
+
+def test_deleting_a_session_drops_its_live_state(app, client):
+    session_id = _session(app)
+    live_transcribe.get_live_transcript(session_id, create=True).add_frame(b"a", 5)
+    assert client.delete(f"/api/sessions/{session_id}").status_code == 200
+    assert live_transcribe.get_live_transcript(session_id) is None
+
+
+def test_abandoned_live_state_expires():
+    live_transcribe.get_live_transcript(9001, create=True)
+    live_transcribe.purge_stale(max_idle=-1)
+    assert live_transcribe.get_live_transcript(9001) is None
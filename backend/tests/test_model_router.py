@@ -0,0 +1,136 @@
+# tests/test_model_router.py
+"""
+Latency-aware routing against a local fake ChatCompletion backend. A fake
+clock stands in for the provider's latency, so nothing actually waits.
+"""
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+import config
+import model_router
+import services
+
+PRIMARY, FALLBACK = "primary-model", "fallback-model"
+BUDGET_MS = 1000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeResponse(dict):
+    def __init__(self, content):
+        super().__init__(usage={"prompt_tokens": 10, "completion_tokens": 2})
+        self.choices = [SimpleNamespace(message={"content": content})]
+
+
+class FakeBackend:
+    """ChatCompletion stand-in; `latency[model]` seconds per call, None = timeout."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.latency = {PRIMARY: 0.2, FALLBACK: 0.2}
+        self.calls = []
+
+    def create(self, model, messages, **kwargs):
+        self.calls.append(model)
+        seconds = self.latency[model]
+        if seconds is None:
+            self.clock.now += 30  # the client's request timeout
+            raise openai.error.Timeout("Request timed out")
+        self.clock.now += seconds
+        return FakeResponse(f"note from {model}")
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setitem(model_router.MODEL_PROFILES, "interpretation", {
+        "primary": PRIMARY,
+        "fallback": FALLBACK,
+        "latency_budget_ms": BUDGET_MS,
+        "json": False,
+    })
+    monkeypatch.setattr(model_router, "LATENCY_WINDOW", 10)
+    monkeypatch.setattr(model_router, "MODEL_LATENCIES", {})
+    monkeypatch.setattr(model_router, "_degraded_calls", {})
+    clock = FakeClock()
+    fake = FakeBackend(clock)
+    monkeypatch.setattr(services, "time", clock)
+    monkeypatch.setattr(model_router, "time", clock)
+    monkeypatch.setattr(services, "CHAT_BACKEND", fake)
+    return fake
+
+
+def _call():
+    content, usage = services.chat_completion("interpretation", [{"role": "user", "content": "hi"}])
+    return usage["model"]
+
+
+def test_fast_primary_is_used(backend):
+    for _ in range(20):
+        assert _call() == PRIMARY
+    assert FALLBACK not in backend.calls
+
+
+def test_timing_out_primary_degrades_to_fallback(backend):
+    backend.latency[PRIMARY] = None
+
+    # Until there are enough samples each call tries the primary, then retries
+    for _ in range(model_router.MIN_SAMPLES):
+        assert _call() == FALLBACK
+    assert backend.calls == [PRIMARY, FALLBACK] * model_router.MIN_SAMPLES
+
+    # Failures count as over budget: calls now skip the primary entirely
+    backend.calls.clear()
+    for _ in range(model_router.PROBE_EVERY - 1):
+        assert _call() == FALLBACK
+    assert backend.calls == [FALLBACK] * (model_router.PROBE_EVERY - 1)
+
+
+def test_slow_primary_is_probed_and_recovers(backend):
+    backend.latency[PRIMARY] = 5.0  # well over the 1 s budget
+    for _ in range(model_router.MIN_SAMPLES):
+        assert _call() == PRIMARY
+
+    # Degraded: 1 in PROBE_EVERY calls still goes to the primary
+    backend.calls.clear()
+    for _ in range(model_router.PROBE_EVERY):
+        _call()
+    assert backend.calls.count(PRIMARY) == 1
+    assert backend.calls[-1] == PRIMARY
+
+    # The primary is fast again; probes refill its window until p95 is back
+    backend.latency[PRIMARY] = 0.2
+    for _ in range(model_router.LATENCY_WINDOW * model_router.PROBE_EVERY):
+        if _call() == PRIMARY and model_router.model_p95(PRIMARY) <= BUDGET_MS:
+            break
+    backend.calls.clear()
+    for _ in range(5):
+        assert _call() == PRIMARY
+    assert backend.calls == [PRIMARY] * 5
+
+
+def test_one_failure_is_forgotten_within_the_max_age(backend, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_LATENCY_MAX_AGE_SECONDS", 600)
+    for _ in range(6):
+        assert _call() == PRIMARY
+    backend.latency[PRIMARY] = None
+    assert _call() == FALLBACK           # the primary timed out once
+    backend.latency[PRIMARY] = 0.2       # ... and is healthy again
+
+    # Within the max age the failure still counts, probes aside
+    assert _call() == FALLBACK
+
+    # Once the failure has aged out, the primary is back, however few
+    # probes were sent in the meantime
+    backend.clock.now += 600
+    backend.calls.clear()
+    for _ in range(5):
+        assert _call() == PRIMARY
+    assert backend.calls == [PRIMARY] * 5
@@ -0,0 +1,86 @@
+# tests/test_overview.py
+import pytest
+from sqlalchemy import event
+
+from models import db, Session, Template, Interpretation
+
+
+@pytest.fixture
+def session_id(app):
+    with app.app_context():
+        s = Session(session_title="Consult", transcription_text="talk")
+        t = Template(template_name="SOAP", template_text="## Subjective\n## Plan")
+        db.session.add_all([s, t])
+        db.session.flush()
+        db.session.add_all([
+            Interpretation(session_id=s.session_id, template_id=t.template_id, generated_text=text)
+            for text in ("first note", "second note")
+        ])
+        db.session.commit()
+        return s.session_id
+
+
+@pytest.fixture
+def queries(app):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def test_default_returns_every_part(client, session_id):
+    data = client.get(f"/api/sessions/{session_id}/overview").get_json()
+    assert set(data) == {"session", "interpretations", "templates"}
+    assert data["session"]["session_title"] == "Consult"
+    assert sorted(i["generated_text"] for i in data["interpretations"]) == ["first note", "second note"]
+    assert [t["template_name"] for t in data["templates"]] == ["SOAP"]
+    assert "template_text" not in data["templates"][0]
+
+
+@pytest.mark.parametrize("include", [
+    "session", "interpretations", "templates", "session,interpretations", " session , templates ",
+])
+def test_include_selects_parts(client, session_id, include):
+    data = client.get(f"/api/sessions/{session_id}/overview", query_string={"include": include}).get_json()
+    assert set(data) == {part.strip() for part in include.split(",")}
+
+
+def test_unknown_include_is_rejected(client, session_id):
+    resp = client.get(f"/api/sessions/{session_id}/overview?include=session,bogus")
+    assert resp.status_code == 400
+    assert "bogus" in resp.get_json()["error"]
+
+
+def test_missing_session_is_404(client):
+    assert client.get("/api/sessions/999/overview").status_code == 404
+
+
+def test_unchanged_overview_is_304(client, session_id):
+    url = f"/api/sessions/{session_id}/overview"
+    first = client.get(url)
+    assert first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    again = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    client.put(f"/api/sessions/{session_id}", json={"session_title": "Renamed"})
+    changed = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+
+
+@pytest.mark.parametrize("include, expected", [
+    ("session,interpretations", 1),  # switching sessions: one joined query
+    ("templates", 2),                # the session is still checked
+    (None, 2),                       # first load
+])
+def test_query_count(client, session_id, queries, include, expected):
+    client.get(f"/api/sessions/{session_id}/overview", query_string={"include": include} if include else None)
+    assert len(queries) == expected, queries
@@ -0,0 +1,123 @@
+# tests/test_profiling.py
+import json
+import os
+
+import pytest
+import requests
+from flask import Flask, g
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+import config
+import profiling
+from models import db, Session
+from testapp import make_app
+
+
+@pytest.fixture
+def sql_timing():
+    profiling._install_sql_timing()
+    yield
+    # The listeners are engine-wide; don't leave them on for other tests
+    for name, listener in profiling._SQL_LISTENERS:
+        if event.contains(Engine, name, listener):
+            event.remove(Engine, name, listener)
+
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch, sql_timing):
+    monkeypatch.setattr(config, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILE_STACK_SAMPLING", False)
+    monkeypatch.setattr(config, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(config, "PROFILE_SLOW_MS", 60_000)
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path / "profiles"))
+    # init_app() wraps requests.Session.send; restore it afterwards
+    monkeypatch.setattr(requests.Session, "send", requests.Session.send)
+
+    app = make_app(f"sqlite:///{tmp_path / 'profiling.db'}", replica_uris=[])
+    profiling.init_app(app)
+    with app.app_context():
+        db.session.add(Session(session_title="Consult"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def _dump(response):
+    name = response.headers.get("X-Profile-Dump")
+    if name is None:
+        return None
+    files = sorted(f for f in os.listdir(config.PROFILE_DIR) if f.startswith(name))
+    with open(os.path.join(config.PROFILE_DIR, name + ".json")) as f:
+        return json.load(f), files
+
+
+def test_failed_statements_do_not_leak_start_times(sql_timing):
+    engine = create_engine("sqlite://")
+    app = Flask(__name__)
+    with app.app_context(), engine.connect() as conn:
+        g.request_profile = prof = profiling.RequestProfile()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+
+        assert conn.info["profile_started"] == []
+    assert [q.get("error") for q in prof.sql] == ["OperationalError"] * 3 + [None]
+
+
+def test_only_the_right_token_turns_on_cprofile(profiled_app):
+    client = profiled_app.test_client()
+    assert _dump(client.get("/api/sessions", headers={"X-Profile-Token": "wrong"})) is None
+    assert _dump(client.get("/api/sessions")) is None
+
+    info, files = _dump(client.get("/api/sessions", headers={"X-Profile-Token": "secret"}))
+    assert info["profiled"] is True
+    assert [os.path.splitext(f)[1] for f in files] == [".json", ".prof"]
+
+
+def test_sample_rate(profiled_app, monkeypatch):
+    client = profiled_app.test_client()
+    assert _dump(client.get("/api/sessions")) is None
+
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 1.0)
+    info, _ = _dump(client.get("/api/sessions"))
+    assert info["profiled"] is True
+
+
+def test_slow_requests_are_dumped_with_their_sql(profiled_app, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_SLOW_MS", 0)
+    info, files = _dump(profiled_app.test_client().get("/api/sessions"))
+    assert info["profiled"] is False
+    assert [os.path.splitext(f)[1] for f in files] == [".json"]
+    assert info["path"] == "/api/sessions"
+    assert any("FROM sessions" in q["statement"] for q in info["sql"])
+
+
+def test_statements_are_recorded_once_however_often_init_app_runs(profiled_app, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_SLOW_MS", 0)
+    profiling.init_app(Flask(__name__))  # e.g. run.py building a second app
+    info, _ = _dump(profiled_app.test_client().get("/api/sessions"))
+    statements = [q["statement"] for q in info["sql"]]
+    assert len(statements) == len(set(statements))
+    assert info["sql_ms"] == round(sum(q["ms"] for q in info["sql"]), 2)
+
+
+def test_prune_keeps_the_newest_dumps(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILE_MAX_DUMPS", 2)
+    for stamp in ("20260101T000001", "20260101T000002", "20260101T000003"):
+        for ext in (".json", ".folded", ".prof"):
+            (tmp_path / f"{stamp}_GET_x_9ms{ext}").touch()
+    (tmp_path / "notes.txt").touch()
+
+    profiling._prune_dumps()
+
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["notes.txt"] + [f"{stamp}_GET_x_9ms{ext}"
+                         for stamp in ("20260101T000002", "20260101T000003")
+                         for ext in (".json", ".folded", ".prof")]
+    )
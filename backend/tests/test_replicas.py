@@ -0,0 +1,72 @@
+# tests/test_replicas.py
+"""
+Read-replica routing with two local SQLite databases. Both hold session 1
+but with different titles, so each response shows which database served it.
+"""
+import time
+
+import pytest
+
+import config
+import replicas
+from models import db, Session
+from testapp import make_app
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "REPLICA_STICKY_SECONDS", 10)
+    monkeypatch.setattr(config, "REPLICA_MAX_LAG_SECONDS", 5)
+    monkeypatch.setattr(replicas, "RECENT_WRITES", {})
+    monkeypatch.setattr(replicas, "REPLICA_LAG", {})
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URIS", [f"sqlite:///{tmp_path / 'replica.db'}"])
+    app = make_app(f"sqlite:///{tmp_path / 'primary.db'}")
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica_0"])
+        for engine, title in ((db.engine, "from primary"), (db.engines["replica_0"], "from replica")):
+            with engine.begin() as conn:
+                conn.execute(Session.__table__.insert().values(session_id=1, session_title=title))
+    yield app
+    with app.app_context():
+        db.session.remove()
+
+
+def _title(client):
+    resp = client.get("/api/sessions/1")
+    assert resp.status_code == 200
+    return resp.get_json()["session_title"]
+
+
+def test_fresh_get_reads_the_replica(app):
+    assert _title(app.test_client()) == "from replica"
+
+
+def test_get_after_own_write_reads_the_primary(app):
+    client = app.test_client()
+    assert client.put("/api/sessions/1", json={"session_title": "renamed"}).status_code == 200
+    assert _title(client) == "renamed"
+
+
+def test_other_clients_read_a_recently_written_session_from_the_primary(app):
+    app.test_client().put("/api/sessions/1", json={"session_title": "renamed"})
+    # No sticky cookie here, but session 1 was just mutated
+    assert _title(app.test_client()) == "renamed"
+
+
+def test_reads_return_to_the_replica_after_the_sticky_window(app, monkeypatch):
+    client = app.test_client()
+    client.put("/api/sessions/1", json={"session_title": "renamed"})
+    monkeypatch.setattr(config, "REPLICA_STICKY_SECONDS", 0)
+    client.delete_cookie(replicas.STICKY_COOKIE)
+    time.sleep(0.01)
+    assert _title(client) == "from replica"
+
+
+def test_lagging_replica_falls_back_to_the_primary(app):
+    replicas.REPLICA_LAG["replica_0"] = (time.monotonic(), config.REPLICA_MAX_LAG_SECONDS + 1)
+    assert _title(app.test_client()) == "from primary"
+
+
+def test_unreachable_replica_falls_back_to_the_primary(app):
+    replicas.REPLICA_LAG["replica_0"] = (time.monotonic(), None)
+    assert _title(app.test_client()) == "from primary"
@@ -0,0 +1,208 @@
+# tests/test_sections.py
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import services
+from models import db, Session, Template
+
+ASSESSMENT = """Psychiatric assessment
+Name:
+DOB:
+
+## Identifying data
+Name:
+DOB:
+Referrer:
+
+## Presenting complaint
+### History
+Onset:
+
+## Mental state examination
+MOOD:
+Mood:
+Risk:
+N/A
+
+## Plan
+"""
+
+
+def test_splits_on_top_level_markdown_headings_only():
+    sections = services.split_template_sections(ASSESSMENT)
+    assert [s["heading"] for s in sections] == [
+        "", "Identifying data", "Presenting complaint", "Mental state examination", "Plan",
+    ]
+    # The preamble is kept, and field labels stay inside their section
+    assert sections[0]["text"] == "Psychiatric assessment\nName:\nDOB:"
+    assert "Referrer:" in sections[1]["text"]
+    assert "### History" in sections[2]["text"]
+    assert sections[3]["text"].endswith("N/A")
+
+
+def test_lone_title_heading_does_not_swallow_the_note():
+    sections = services.split_template_sections("# SOAP note\n## Subjective\nx\n## Objective\ny")
+    assert [s["heading"] for s in sections] == ["", "Subjective", "Objective"]
+    assert sections[0]["text"] == "# SOAP note"
+
+
+def test_templates_without_markdown_headings_are_not_split():
+    assert services.split_template_sections("Name:\nDOB:\nMood:\nRisk:\nN/A\nPLAN") == []
+
+
+class SectionBackend:
+    """Answers each call with the heading it was asked for ("" = whole note)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.sections = []    # first line of each section asked for
+        self.version = ""     # appended to answers, to tell runs apart
+        self.on_call = None
+        self.lock = threading.Lock()
+
+    def create(self, model, messages, **kwargs):
+        with self.lock:
+            self.calls += 1
+        last = messages[-1]["content"]
+        if last.startswith("Write ONLY"):
+            first_line = last.split("'''")[1].splitlines()[0]
+            with self.lock:
+                self.sections.append(first_line)
+            content = first_line + self.version
+        else:
+            content = "whole note"
+        if self.on_call:
+            self.on_call()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message={"content": content})],
+            get=lambda key, default=None: {"prompt_tokens": 100, "completion_tokens": 10}
+            if key == "usage" else default,
+        )
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = SectionBackend()
+    monkeypatch.setattr(services, "CHAT_BACKEND", fake)
+    return fake
+
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        s = Session(session_title="Assessment", transcription_text="clinician and patient talk")
+        t = Template(template_name="Assessment", template_text=ASSESSMENT)
+        db.session.add_all([s, t])
+        db.session.commit()
+        return s.session_id, t.template_id
+
+
+def test_parallel_mode_is_opt_in(app, backend, ids):
+    with app.app_context():
+        interp = services.generate_interpretation(*ids)
+        assert backend.calls == 1
+        assert interp.generated_text == "whole note"
+        assert interp.sections_json is None
+
+
+def test_parallel_sections_reassemble_in_order_with_preamble(app, backend, ids):
+    with app.app_context():
+        interp = services.generate_interpretation(*ids, parallel_sections=True)
+        assert backend.calls == 5
+        assert interp.generated_text.split("\n\n") == [
+            "Psychiatric assessment", "## Identifying data", "## Presenting complaint",
+            "## Mental state examination", "## Plan",
+        ]
+
+
+def test_min_sections_threshold_counts_headed_sections(app, backend, ids, monkeypatch):
+    monkeypatch.setattr(config, "SECTION_PARALLEL_MIN_SECTIONS", 4)
+    with app.app_context():
+        services.generate_interpretation(*ids)
+    assert backend.calls == 5
+
+
+def _edit_template(template_id, text, engine=None):
+    # Commits outside the session under test, like a concurrent PUT would
+    with (engine or db.engine).begin() as conn:
+        conn.execute(Template.__table__.update()
+                     .where(Template.template_id == template_id)
+                     .values(template_text=text))
+
+
+def _parallel_note(app, backend, ids):
+    with app.app_context():
+        interp_id = services.generate_interpretation(*ids, parallel_sections=True).interpretation_id
+    backend.calls, backend.sections, backend.version = 0, [], " v2"
+    return interp_id
+
+
+def test_template_edit_regenerates_only_changed_sections(app, backend, ids):
+    interp_id = _parallel_note(app, backend, ids)
+    edited = (ASSESSMENT
+              .replace("## Presenting complaint\n### History\nOnset:\n\n", "")
+              .replace("## Plan", "## Plan\nFollow-up:"))
+    with app.app_context():
+        _edit_template(ids[1], edited)
+        services.regenerate_changed_sections(ids[1])
+
+        assert backend.sections == ["## Plan"]
+        interp = db.session.get(services.Interpretation, interp_id)
+        # Unchanged sections keep their text; the removed one is gone
+        assert interp.generated_text.split("\n\n") == [
+            "Psychiatric assessment", "## Identifying data",
+            "## Mental state examination", "## Plan v2",
+        ]
+        assert [s["heading"] for s in json.loads(interp.sections_json)] == [
+            "", "Identifying data", "Mental state examination", "Plan",
+        ]
+
+
+def test_run_from_an_outdated_template_does_not_write(app, backend, ids):
+    interp_id = _parallel_note(app, backend, ids)
+    first = ASSESSMENT.replace("## Plan", "## Plan\nFollow-up:")
+    second = ASSESSMENT.replace("## Plan", "## Plan\nReview in:")
+    with app.app_context():
+        _edit_template(ids[1], first)
+        # The template is edited again while the first run is generating
+        engine = db.engine
+        backend.on_call = lambda: _edit_template(ids[1], second, engine)
+        services.regenerate_changed_sections(ids[1])
+        backend.on_call = None
+
+        interp = db.session.get(services.Interpretation, interp_id)
+        assert interp.generated_text.endswith("## Plan")
+
+        # The newer edit's run brings the note up to date with its text
+        backend.sections, backend.version = [], " v3"
+        services.regenerate_changed_sections(ids[1])
+        db.session.refresh(interp)
+        assert backend.sections == ["## Plan"]
+        assert interp.generated_text.endswith("## Plan v3")
+        sections = services.split_template_sections(second)
+        assert [s["hash"] for s in json.loads(interp.sections_json)] == [s["hash"] for s in sections]
+
+
+def test_regenerations_of_one_template_run_one_at_a_time(app, backend, ids, monkeypatch):
+    running, overlaps = [], []
+
+    def slow(template_id):
+        if running:
+            overlaps.append(template_id)
+        running.append(template_id)
+        time.sleep(0.05)
+        running.pop()
+
+    monkeypatch.setattr(services, "_regenerate_changed_sections", slow)
+    threads = [threading.Thread(target=services.regenerate_changed_sections, args=(ids[1],))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert overlaps == []
@@ -0,0 +1,19 @@
+# tests/test_templates.py
+from models import db, Session, Template
+
+
+def test_get_template_returns_the_text_the_index_omits(app, client):
+    with app.app_context():
+        t = Template(template_name="SOAP", template_text="## Subjective\n## Plan")
+        s = Session(session_title="Consult")
+        db.session.add_all([s, t])
+        db.session.commit()
+        session_id, template_id = s.session_id, t.template_id
+
+    index = client.get(f"/api/sessions/{session_id}/overview?include=templates").get_json()["templates"]
+    assert "template_text" not in index[0]
+
+    resp = client.get(f"/api/templates/{template_id}")
+    assert resp.status_code == 200
+    assert resp.get_json()["template_text"] == "## Subjective\n## Plan"
+    assert client.get("/api/templates/999").status_code == 404
@@ -0,0 +1,17 @@
+# tests/test_tokens.py
+import pytest
+
+import tokens
+
+
+def test_unloadable_encoding_falls_back_to_character_estimate(offline):
+    assert tokens.count_tokens("x" * 40) == 10
+    assert tokens.truncate_to_tokens("x" * 40, 5) == "x" * 20
+    assert tokens.count_message_tokens([{"role": "user", "content": "x" * 8}]) == 2 + 3 + 3
+
+
+def test_failed_load_is_not_retried_on_every_call(offline, monkeypatch):
+    tokens.count_tokens("hello")
+    monkeypatch.setattr(tokens.tiktoken, "encoding_for_model",
+                        lambda model: pytest.fail("retried too soon"))
+    tokens.count_tokens("hello again")
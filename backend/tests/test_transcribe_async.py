@@ -0,0 +1,115 @@
+# tests/test_transcribe_async.py
+import threading
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+import replicas
+import services
+import transcribe_async
+from scheduling import pick_next
+from transcribe_async import TranscriptionScheduler, job_status
+
+AGING = 2
+RTF = 0.1
+
+
+@pytest.fixture
+def scheduler():
+    return TranscriptionScheduler(workers=1, aging_factor=AGING, initial_rtf=RTF)
+
+
+@pytest.fixture
+def blocker(scheduler):
+    """Occupy the only worker until released, so later jobs queue up."""
+    started, release = threading.Event(), threading.Event()
+
+    def fn():
+        started.set()
+        release.wait(10)
+
+    job = scheduler.submit(1, 10.0, fn)
+    assert started.wait(5)
+    yield SimpleNamespace(job=job, release=release)
+    release.set()
+
+
+def test_finished_job_keeps_session_reads_on_the_primary(scheduler):
+    replicas.RECENT_WRITES.pop(4242, None)
+
+    seen = {}
+
+    def fn():
+        seen["marked_while_running"] = 4242 in replicas.RECENT_WRITES
+        return "ok"
+
+    job = scheduler.submit(4242, 1.0, fn)
+    job.wait(5)
+
+    assert job.status == "done"
+    assert not seen["marked_while_running"]
+    assert 4242 in replicas.RECENT_WRITES
+
+
+def test_short_job_submitted_after_a_long_one_runs_first(scheduler, blocker):
+    order = []
+    long_job = scheduler.submit(2, 3600.0, lambda: order.append("long"))
+    short_job = scheduler.submit(3, 30.0, lambda: order.append("short"))
+    blocker.release.set()
+    long_job.wait(5)
+    short_job.wait(5)
+    assert order == ["short", "long"]
+
+
+def test_aging_eventually_promotes_the_long_job():
+    long_job = SimpleNamespace(duration=3600.0, submitted_at=0.0)
+    # Both age at the same rate; the long job's head start counts
+    soon = SimpleNamespace(duration=30.0, submitted_at=100.0)
+    later = SimpleNamespace(duration=30.0, submitted_at=1800.0)
+    assert pick_next([long_job, soon], now=1800.0, aging_factor=AGING) is soon
+    assert pick_next([long_job, later], now=1800.0, aging_factor=AGING) is long_job
+
+
+def test_eta_and_queue_position(scheduler, blocker, monkeypatch):
+    monkeypatch.setattr(transcribe_async, "scheduler", scheduler)  # for job_status()
+    long_job = scheduler.submit(2, 3600.0, lambda: None)
+    short_job = scheduler.submit(3, 30.0, lambda: None)
+
+    running_left = 10.0 * RTF
+    eta, position = scheduler.eta(short_job)
+    assert position == 1
+    assert eta == pytest.approx(running_left + 30.0 * RTF, abs=0.2)
+
+    status = job_status(long_job)
+    assert status["queue_position"] == 2
+    assert status["status"] == "queued"
+    assert status["eta_seconds"] == pytest.approx(running_left + 30.0 * RTF + 3600.0 * RTF, abs=0.2)
+
+    assert scheduler.eta(blocker.job)[1] == 0
+    blocker.release.set()
+    short_job.wait(5)
+    assert scheduler.eta(short_job) == (0.0, 0)
+
+
+def test_only_jobs_that_called_whisper_update_the_realtime_factor(scheduler, tmp_path, monkeypatch):
+    # A cache hit (or anything else that skips Whisper) leaves the ETA alone
+    scheduler.submit(1, 60.0, lambda: time.sleep(0.01)).wait(5)
+    assert scheduler.rtf == RTF
+
+    audio = tmp_path / "consult.mp3"
+    audio.write_bytes(b"\xff\xfb" * 10)
+
+    def whisper(model, audio_file, **kwargs):
+        time.sleep(0.5)
+        return {"text": "consult"}
+
+    monkeypatch.setattr(openai.Audio, "transcribe", whisper)
+
+    def fn():
+        services.whisper_transcribe(str(audio))
+        time.sleep(0.5)  # e.g. title generation: not Whisper time
+
+    scheduler.submit(2, 1.0, fn).wait(5)
+    assert scheduler.rtf == pytest.approx(0.8 * RTF + 0.2 * 0.5, abs=0.03)
@@ -0,0 +1,68 @@
+# tests/test_upload_stream.py
+import io
+import os
+import sys
+
+import pytest
+
+from upload_stream import stream_audio_upload, UploadError
+
+BOUNDARY = "testboundary"
+
+# Like real ffmpeg, MP4 input (moov atom at the end) only works from a file
+FAKE_FFMPEG = """#!{python}
+import shutil, sys
+src, out = sys.argv[sys.argv.index("-i") + 1], sys.argv[-1]
+data = sys.stdin.buffer.read() if src == "pipe:0" else open(src, "rb").read()
+if src == "pipe:0" and data.startswith(b"ftyp"):
+    sys.exit("moov atom not found")
+if data.startswith(b"garbage"):
+    sys.exit("Invalid data found when processing input")
+with open(out, "wb") as f:
+    f.write(b"mp3 of " + data)
+"""
+
+
+@pytest.fixture(autouse=True)
+def fake_ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+
+
+def _upload(dest, filename, content_type, data):
+    body = (f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n").encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return stream_audio_upload(io.BytesIO(body), f"multipart/form-data; boundary={BOUNDARY}",
+                               str(dest), "session_1_")
+
+
+@pytest.mark.parametrize("filename, content_type", [
+    ("consult.m4a", "audio/x-m4a"),
+    ("consult.MP4", "application/octet-stream"),
+    ("recording", "audio/mp4"),     # no extension, known by its Content-Type
+])
+def test_mp4_containers_are_spooled_and_converted_from_a_file(tmp_path, filename, content_type):
+    dest = tmp_path / "audio"
+    mp3_path = _upload(dest, filename, content_type, b"ftyp mdat moov")
+    with open(mp3_path, "rb") as f:
+        assert f.read() == b"mp3 of ftyp mdat moov"
+    assert os.listdir(dest) == [os.path.basename(mp3_path)]  # spool removed
+
+
+def test_webm_is_still_piped(tmp_path):
+    mp3_path = _upload(tmp_path, "consult.webm", "audio/webm", b"webm cluster")
+    with open(mp3_path, "rb") as f:
+        assert f.read() == b"mp3 of webm cluster"
+
+
+def test_failed_conversion_of_a_spooled_upload_cleans_up(tmp_path):
+    with pytest.raises(UploadError) as err:
+        _upload(tmp_path / "audio", "consult.m4a", "audio/x-m4a", b"garbage")
+    assert err.value.status == 500
+    assert "Invalid data" in str(err.value)
+    assert os.listdir(tmp_path / "audio") == []
@@ -0,0 +1,53 @@
+# tests/test_whisper_split.py
+import os
+
+import openai
+import pytest
+
+import services
+
+
+def test_small_files_go_to_whisper_whole(tmp_path, monkeypatch):
+    audio = tmp_path / "short.mp3"
+    audio.write_bytes(b"\xff\xfb" * 100)
+    sent = []
+    monkeypatch.setattr(openai.Audio, "transcribe",
+                        lambda model, f, **kw: sent.append(f.name) or {"text": "short consult"})
+    monkeypatch.setattr(services, "run_ffmpeg", lambda args: pytest.fail("small files must not be split"))
+
+    assert services.whisper_transcribe(str(audio)) == "short consult"
+    assert sent == [str(audio)]
+
+
+def test_large_files_are_split_and_joined_in_order(tmp_path, monkeypatch):
+    audio = tmp_path / "long.mp3"
+    audio.write_bytes(b"\xff\xfb" * 100)
+    monkeypatch.setattr(services, "WHISPER_MAX_BYTES", 10)
+
+    ffmpeg_calls = []
+
+    def fake_ffmpeg(args):
+        ffmpeg_calls.append(args)
+        pattern = args[-1]
+        for i in (2, 0, 1):  # listing order must not matter
+            with open(pattern.replace("%03d", f"{i:03d}"), "wb") as f:
+                f.write(f"segment {i}".encode())
+
+    prompts = []
+
+    def whisper(model, audio_file, prompt=None):
+        prompts.append(prompt)
+        return {"text": f" {audio_file.read().decode()} text "}
+
+    monkeypatch.setattr(services, "run_ffmpeg", fake_ffmpeg)
+    monkeypatch.setattr(openai.Audio, "transcribe", whisper)
+
+    text = services.whisper_transcribe(str(audio))
+
+    assert text == "segment 0 text segment 1 text segment 2 text"
+    assert prompts == [None, "segment 0 text", "segment 1 text"]
+    args = ffmpeg_calls[0]
+    assert args[args.index("-segment_time") + 1] == str(services.WHISPER_SEGMENT_SECONDS)
+    assert args[args.index("-b:a") + 1] == "64k"
+    # segments are cleaned up; the source is left to the caller
+    assert os.listdir(tmp_path) == ["long.mp3"]
@@ -0,0 +1,47 @@
+# tests/testapp.py
+"""
+Test environment and a trimmed-down create_app() (no APScheduler, no
+Socket.IO server) shared by the pytest suite and the eventlet server
+script. Import this before any backend module: config.py reads the
+environment at import time.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("AUDIO_UPLOAD_FOLDER", tempfile.mkdtemp(prefix="scrib_audio_"))
+os.environ.setdefault("PROFILE_ENABLED", "0")
+
+from flask import Flask  # noqa: E402
+
+import config  # noqa: E402
+import replicas  # noqa: E402
+from models import db  # noqa: E402
+from routes import routes_blueprint  # noqa: E402
+
+
+def make_app(database_uri=None, replica_uris=None):
+    """A Flask app wired like app.create_app(), with its tables created."""
+    if replica_uris is not None:
+        config.DATABASE_REPLICA_URIS = list(replica_uris)
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri or config.DATABASE_URI
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["MAX_CONTENT_LENGTH"] = config.MAX_UPLOAD_MB * 1024 * 1024
+    app.config["SQLALCHEMY_BINDS"] = replicas.replica_binds()
+    app.config["TESTING"] = True
+
+    db.init_app(app)
+    replicas.init_app(app, db)
+    app.register_blueprint(routes_blueprint, url_prefix="/api")
+
+    with app.app_context():
+        db.create_all(bind_key=None)  # replica schemas are not ours to create
+    return app
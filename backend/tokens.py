@@ -0,0 +1,69 @@
+# tokens.py
+"""
+Local token counting for prompts, so we know what a call will cost before
+it is sent and can cap oversized transcripts.
+
+Uses tiktoken when it is installed and its BPE file can be loaded;
+otherwise falls back to the usual ~4 characters per token estimate, which
+is close enough for budgeting. tiktoken downloads the BPE file on first use
+unless TIKTOKEN_CACHE_DIR already holds it, so offline hosts should ship it
+there. A failed load is retried after ENCODING_RETRY_SECONDS.
+"""
+import time
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+_ENCODINGS = {}
+_FAILED_AT = {}  # model -> monotonic time of the last failed load
+CHARS_PER_TOKEN = 4
+ENCODING_RETRY_SECONDS = 300
+
+
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    if model in _ENCODINGS:
+        return _ENCODINGS[model]
+    failed_at = _FAILED_AT.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
+    try:
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # BPE download failed (offline, blocked host, ...)
+        print(f"Could not load tiktoken encoding for {model}, estimating tokens: {e}")
+        _FAILED_AT[model] = time.monotonic()
+        return None
+    _ENCODINGS[model] = enc
+    return enc
+
+
+def count_tokens(text, model="gpt-4o"):
+    """Number of tokens in `text` for `model`."""
+    if not text:
+        return 0
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(enc.encode(text))
+
+
+def count_message_tokens(messages, model="gpt-4o"):
+    """Tokens for a chat `messages` list, including per-message overhead."""
+    # ~3 tokens of framing per message plus 3 to prime the reply
+    return sum(count_tokens(m["content"], model) + 3 for m in messages) + 3
+
+
+def truncate_to_tokens(text, max_tokens, model="gpt-4o"):
+    """Return `text` cut down to at most `max_tokens` tokens."""
+    if not text or max_tokens is None or count_tokens(text, model) <= max_tokens:
+        return text
+    enc = _encoding(model)
+    if enc is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return enc.decode(enc.encode(text)[:max_tokens])
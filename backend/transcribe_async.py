@@ -1,6 +1,14 @@
 # transcribe_async.py
+import os
 import threading
-from services import transcribe_audio_file
+import time
+import uuid
+
+import config
+import replicas
+from green import run_ffmpeg
+from scheduling import job_priority, pick_next
+from services import transcribe_audio_file, take_whisper_seconds
 from models import db, Session
 
 # A dictionary to track each session’s status
@@ -29,3 +37,175 @@ def start_transcription_in_thread(mp3_path, session_id):
 
     t = threading.Thread(target=do_transcription, daemon=True)
     t.start()
+
+
+# -------------------------------------------------------------------
+# DURATION-AWARE SCHEDULING
+# Uploads are probed for duration and queued shortest-job-first with
+# aging: a job's priority is its audio length minus AGING_FACTOR seconds
+# for every second it has waited, so a 30 s dictation jumps ahead of an
+# hour-long consult, but the consult still starts within a bounded time.
+# -------------------------------------------------------------------
+def probe_duration(audio_path):
+    """Audio length in seconds via ffprobe; estimated from file size if that fails."""
+    try:
+        out = run_ffmpeg(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+            capture_output=True, text=True,
+        )
+        return float(out.stdout.strip())
+    except Exception as e:
+        print(f"ffprobe failed for {audio_path}, estimating duration: {e}")
+        # our MP3s are 64-192 kbit/s; assume the middle
+        return os.path.getsize(audio_path) * 8 / 128000
+
+
+class TranscriptionJob:
+    def __init__(self, session_id, duration, fn, app=None, submitted_at=None):
+        self.job_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.duration = duration
+        self.fn = fn
+        self.app = app
+        self.submitted_at = time.monotonic() if submitted_at is None else submitted_at
+        self.started_at = None
+        self.finished_at = None
+        self.status = "queued"        # queued / pending / done / error
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.result
+
+
+class TranscriptionScheduler:
+    """
+    A fixed pool of workers pulling jobs by job_priority(). Keeps an EWMA
+    of the observed realtime factor (Whisper seconds per audio second) to
+    give clients an ETA. Only jobs that actually called Whisper update it:
+    cache hits finish almost instantly and would drag the ETA toward 0.
+    """
+
+    def __init__(self, workers, aging_factor, initial_rtf):
+        self.workers = workers
+        self.aging_factor = aging_factor
+        self.rtf = initial_rtf
+        self._pending = []
+        self._running = []
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def submit(self, session_id, duration, fn, app=None):
+        job = TranscriptionJob(session_id, duration, fn, app)
+        with self._cond:
+            self._pending.append(job)
+            self._start_workers()
+            self._cond.notify()
+        JOBS[job.job_id] = job
+        SESSION_JOBS[session_id] = job
+        TRANSCRIPTION_STATUS[session_id] = "queued"
+        _prune_jobs()
+        return job
+
+    def eta(self, job):
+        """Seconds until `job` is expected to finish, and its queue position."""
+        now = time.monotonic()
+        with self._cond:
+            if job.status in ("done", "error"):
+                return 0.0, 0
+            running_left = [max(0.0, j.duration * self.rtf - (now - j.started_at))
+                            for j in self._running]
+            if job in self._running:
+                return max(0.0, job.duration * self.rtf - (now - job.started_at)), 0
+            order = sorted(self._pending, key=lambda j: job_priority(j, now, self.aging_factor))
+            position = order.index(job) if job in order else 0
+            ahead = sum(j.duration * self.rtf for j in order[:position]) + sum(running_left)
+        return ahead / self.workers + job.duration * self.rtf, position + 1
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job = pick_next(self._pending, time.monotonic(), self.aging_factor)
+                self._pending.remove(job)
+                self._running.append(job)
+                job.started_at = time.monotonic()
+                job.status = "pending"
+            TRANSCRIPTION_STATUS[job.session_id] = "pending"
+
+            take_whisper_seconds()  # start this job's count from zero
+            try:
+                if job.app is not None:
+                    with job.app.app_context():
+                        job.result = job.fn()
+                else:
+                    job.result = job.fn()
+                # The job wrote the transcript/title long after the request
+                # returned. Keep this session's reads on the primary for a
+                # while, starting before the poll can see "done"
+                replicas.mark_session_written(job.session_id)
+                job.status = "done"
+            except Exception as e:
+                print(f"Error in scheduled transcription for session {job.session_id}:", e)
+                job.error = str(e)
+                job.status = "error"
+
+            job.finished_at = time.monotonic()
+            whisper_seconds = take_whisper_seconds()
+            with self._cond:
+                self._running.remove(job)
+                if job.status == "done" and job.duration > 0 and whisper_seconds > 0:
+                    observed = whisper_seconds / job.duration
+                    self.rtf = 0.8 * self.rtf + 0.2 * observed
+            TRANSCRIPTION_STATUS[job.session_id] = job.status
+            job.done.set()
+
+
+# JOBS[job_id] / SESSION_JOBS[session_id] → TranscriptionJob (latest per session)
+JOBS = {}
+SESSION_JOBS = {}
+JOB_RETENTION_SECONDS = 3600
+
+def _prune_jobs():
+    cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+    for job_id, job in list(JOBS.items()):
+        if job.finished_at is not None and job.finished_at < cutoff:
+            JOBS.pop(job_id, None)
+            if SESSION_JOBS.get(job.session_id) is job:
+                SESSION_JOBS.pop(job.session_id, None)
+
+
+scheduler = TranscriptionScheduler(
+    workers=config.TRANSCRIBE_WORKERS,
+    aging_factor=config.TRANSCRIBE_AGING_FACTOR,
+    initial_rtf=config.TRANSCRIBE_INITIAL_RTF,
+)
+
+
+def schedule_transcription(session_id, audio_path, fn, app=None):
+    """Probe `audio_path` and queue `fn` (which transcribes it) by duration."""
+    duration = probe_duration(audio_path)
+    return scheduler.submit(session_id, duration, fn, app)
+
+
+def job_status(job):
+    eta, position = scheduler.eta(job)
+    return {
+        "job_id": job.job_id,
+        "session_id": job.session_id,
+        "status": job.status,
+        "audio_seconds": round(job.duration, 1),
+        "eta_seconds": round(eta, 1),
+        "queue_position": position,
+        "error": job.error,
+    }
@@ -0,0 +1,207 @@
+# upload_stream.py
+"""
+Stream an audio upload straight into ffmpeg.
+
+The multipart body is parsed incrementally (werkzeug's sans-IO decoder)
+and the "file" part is written to ffmpeg's stdin as it arrives, so the
+conversion overlaps the upload and nothing but the MP3 output touches the
+disk. Only one read chunk plus the OS pipe buffer is held in memory at a
+time: when ffmpeg falls behind, the pipe fills and we simply stop reading
+from the client until it catches up. MP3 uploads skip ffmpeg and are
+written to disk the same way.
+
+MP4-family containers (.m4a, .mp4, .mov, ...) can't be read from a pipe:
+their index (the moov atom) is often at the end of the file, and ffmpeg
+has to seek to it. Those are spooled to a temp file next to the output and
+converted once the upload is complete.
+
+Under eventlet, `subprocess` is monkey-patched, so pipe writes and
+wait() yield to other greenlets instead of blocking the worker.
+"""
+import os
+import subprocess
+import tempfile
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+READ_SIZE = 64 * 1024
+# Speech-grade mono, like the recorder's own chunks: keeps an hour of
+# audio under 30 MB (Whisper takes 25 MB per request)
+MP3_ARGS = ["-vn", "-ac", "1", "-b:a", "64k"]
+# Containers ffmpeg must seek in, by extension and by part Content-Type
+SEEKABLE_EXTENSIONS = {".m4a", ".mp4", ".m4v", ".mov", ".3gp", ".3g2"}
+SEEKABLE_MIMETYPES = {"audio/mp4", "audio/x-m4a", "audio/m4a", "video/mp4",
+                      "video/quicktime", "audio/3gpp", "video/3gpp"}
+# Decoder buffer bound: one read plus the unconsumed boundary lookahead
+MAX_BUFFERED = 2 * READ_SIZE
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def stream_audio_upload(stream, content_type, dest_dir, prefix):
+    """
+    Read a multipart/form-data body from `stream` and turn its "file" part
+    into an MP3 at dest_dir/<prefix><name>.mp3. Returns the MP3 path.
+    Raises UploadError for a missing/empty file or a failed conversion.
+    """
+    mimetype, options = parse_options_header(content_type or "")
+    if mimetype != "multipart/form-data" or "boundary" not in options:
+        raise UploadError("No file provided")
+
+    decoder = MultipartDecoder(options["boundary"].encode("latin-1"), MAX_BUFFERED)
+    sink = None
+    in_file = False
+    finished = False
+    try:
+        while not finished:
+            chunk = stream.read(READ_SIZE)
+            decoder.receive_data(chunk or None)
+            try:
+                event = decoder.next_event()
+                while not isinstance(event, NeedData):
+                    if isinstance(event, File) and event.name == "file" and sink is None:
+                        filename = os.path.basename(event.filename or "")
+                        if not filename:
+                            raise UploadError("Empty filename")
+                        mimetype = parse_options_header(event.headers.get("Content-Type", ""))[0]
+                        sink = _open_sink(filename, mimetype, dest_dir, prefix)
+                        in_file = True
+                    elif isinstance(event, (File, Field)):
+                        in_file = False
+                    elif isinstance(event, Data) and in_file:
+                        sink.write(event.data)
+                    elif isinstance(event, Epilogue):
+                        finished = True
+                        break
+                    event = decoder.next_event()
+            except ValueError as e:  # malformed or truncated multipart body
+                raise UploadError(f"Invalid upload: {e}")
+            if not chunk and not finished:
+                raise UploadError("Upload ended unexpectedly")
+
+        if sink is None:
+            raise UploadError("No file provided")
+        return sink.finish()
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+
+
+def _open_sink(filename, mimetype, dest_dir, prefix):
+    os.makedirs(dest_dir, exist_ok=True)
+    stem, ext = os.path.splitext(filename)
+    mp3_path = os.path.join(dest_dir, prefix + stem + ".mp3")
+    if ext.lower() == ".mp3":
+        return _FileSink(mp3_path)
+    if ext.lower() in SEEKABLE_EXTENSIONS or mimetype in SEEKABLE_MIMETYPES:
+        return _SpooledFfmpegSink(mp3_path, ext)
+    # Otherwise, assume it's WebM (or anything else ffmpeg can demux from a pipe)
+    return _FfmpegSink(mp3_path)
+
+
+class _FileSink:
+    def __init__(self, path):
+        self.path = path
+        print("Saving MP3 file to:", path)
+        self.file = open(path, "wb")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def finish(self):
+        self.file.close()
+        return self.path
+
+    def abort(self):
+        self.file.close()
+        _remove_quietly(self.path)
+
+
+class _FfmpegSink:
+    def __init__(self, path):
+        self.path = path
+        print("Converting upload to MP3:", path)
+        # stderr goes to a temp file: a pipe could fill up and stall ffmpeg
+        self.errors = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(
+            ["ffmpeg", "-y", "-v", "error", "-i", "pipe:0", *MP3_ARGS, path],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self.errors,
+        )
+
+    def write(self, data):
+        try:
+            self.proc.stdin.write(data)
+        except BrokenPipeError:
+            raise UploadError(f"Error converting file: {self._stderr()}", 500)
+
+    def finish(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        if self.proc.wait() != 0:
+            message = self._stderr()
+            _remove_quietly(self.path)
+            raise UploadError(f"Error converting file: {message}", 500)
+        self.errors.close()
+        print("Conversion successful.")
+        return self.path
+
+    def abort(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self.errors.close()
+        _remove_quietly(self.path)
+
+    def _stderr(self):
+        self.proc.wait()
+        self.errors.seek(0)
+        return self.errors.read().decode("utf-8", "replace").strip() or f"ffmpeg exited with {self.proc.returncode}"
+
+
+class _SpooledFfmpegSink:
+    """Save the upload to a temp file, then convert it (ffmpeg can seek)."""
+
+    def __init__(self, path, ext):
+        self.path = path
+        print("Spooling upload for conversion to MP3:", path)
+        self.spool = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), prefix="upload_", suffix=ext, delete=False)
+
+    def write(self, data):
+        self.spool.write(data)
+
+    def finish(self):
+        self.spool.close()
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-y", "-v", "error", "-i", self.spool.name, *MP3_ARGS, self.path],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            )
+        finally:
+            _remove_quietly(self.spool.name)
+        if result.returncode != 0:
+            _remove_quietly(self.path)
+            message = result.stderr.decode("utf-8", "replace").strip() or f"ffmpeg exited with {result.returncode}"
+            raise UploadError(f"Error converting file: {message}", 500)
+        print("Conversion successful.")
+        return self.path
+
+    def abort(self):
+        self.spool.close()
+        _remove_quietly(self.spool.name)
+        _remove_quietly(self.path)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -1,5 +1,5 @@
 # wsgi.py
-import eventlet
-eventlet.monkey_patch()
+import green
+green.monkey_patch()  # before anything else imports socket / psycopg2
 
 from app import app  # Import the Flask app created in app.py
@@ -1,6 +1,7 @@
 // src/App.js
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { getSessionOverview } from './api';
 import { ThemeProvider } from '@mui/material/styles';
 import CssBaseline from '@mui/material/CssBaseline';
 
@@ -19,6 +20,8 @@ function App() {
   const [selectedSessionId, setSelectedSessionId] = useState(null);
   const [selectedSession, setSelectedSession] = useState(null);
   const [isRecording, setIsRecording] = useState(false);          // ← NEW
+  /* template index: loaded with the first overview, then on template edits */
+  const templateIndexRef = useRef(null);
 
   /* ------------------------------------------------------------ */
   /*  Initial fetch                                               */
@@ -43,16 +46,38 @@ function App() {
   /* ------------------------------------------------------------ */
   const fetchSessionById = async (sessionId) => {
     try {
-      const res = await axios.get(`/api/sessions/${sessionId}`);
-      setSelectedSession(res.data);
+      /* one round-trip: session and its notes (one joined query); the
+         template index only on first load, edits refresh it below */
+      const res = await getSessionOverview(
+        sessionId,
+        templateIndexRef.current ? 'session,interpretations' : undefined
+      );
+      const { session, interpretations, templates = templateIndexRef.current } = res.data;
+      templateIndexRef.current = templates;
+      setSelectedSession({ ...session, interpretations, templateIndex: templates });
       setSessions((prev) =>
-        prev.map((s) => (s.session_id === sessionId ? res.data : s))
+        prev.map((s) => (s.session_id === sessionId ? session : s))
       );
     } catch (err) {
       console.error('Error fetching single session:', err);
     }
   };
 
+  /* templates saved, starred or deleted: reload only the index */
+  const refreshTemplateIndex = async (sessionId) => {
+    try {
+      const res = await getSessionOverview(sessionId, 'templates');
+      templateIndexRef.current = res.data.templates;
+      setSelectedSession((prev) =>
+        prev && prev.session_id === sessionId
+          ? { ...prev, templateIndex: res.data.templates }
+          : prev
+      );
+    } catch (err) {
+      console.error('Error fetching templates:', err);
+    }
+  };
+
   /* ------------------------------------------------------------ */
   /*  Create session                                              */
   /* ------------------------------------------------------------ */
@@ -92,7 +117,8 @@ function App() {
       selectedSession &&
       selectedSession.session_id === updatedSession.session_id
     ) {
-      setSelectedSession(updatedSession);
+      /* keep transcript, notes & template index loaded with the overview */
+      setSelectedSession({ ...selectedSession, ...updatedSession });
     }
   };
 
@@ -123,6 +149,7 @@ function App() {
             sessionData={selectedSession}
             onSessionUpdate={handleSessionUpdate}
             fetchSessionDetails={fetchSessionById}
+            onTemplatesChanged={refreshTemplateIndex}
             onCreateSession={handleCreateSession}
           />
         </div>
@@ -1,5 +1,6 @@
 // src/api.js
 import axios from 'axios';
+import { io } from 'socket.io-client';
 
 const apiClient = axios.create({
   baseURL: '', // Use relative URLs so that Nginx (or another proxy) can route correctly.
@@ -12,6 +13,14 @@ export function getSessions() {
   return apiClient.get('/api/sessions');
 }
 
+// Session + its interpretations + template index in one request;
+// `include` picks parts, e.g. 'templates' to refresh only the index
+export function getSessionOverview(sessionId, include) {
+  return apiClient.get(`/api/sessions/${sessionId}/overview`, {
+    params: include ? { include } : undefined,
+  });
+}
+
 export function createSession(sessionTitle) {
   return apiClient.post('/api/sessions', { session_title: sessionTitle });
 }
@@ -28,6 +37,11 @@ export function getTemplates() {
   return apiClient.get('/api/templates');
 }
 
+// Full template (with template_text), e.g. before editing it
+export function getTemplate(templateId) {
+  return apiClient.get(`/api/templates/${templateId}`);
+}
+
 export function createTemplate(templateName, templateText) {
   return apiClient.post('/api/templates', {
     template_name: templateName,
@@ -52,11 +66,13 @@ export function deleteAudio(sessionId) {
   return apiClient.delete(`/api/sessions/${sessionId}/audio`);
 }
 
-export async function uploadChunk(sessionId, fileBlob) {
+export async function uploadChunk(sessionId, fileBlob, chunkId) {
   // Accepts a Blob or File for a partial MP3
   const formData = new FormData();
   // We'll name it "chunk.mp3" or any unique name
   formData.append('file', new File([fileBlob], 'chunk.mp3', { type: 'audio/mp3' }));
+  // Same id as the live frame, so the server skips a chunk it already has
+  if (chunkId) formData.append('chunk_id', chunkId);
   
   const res = await axios.post(`/api/sessions/${sessionId}/chunks`, formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
@@ -64,8 +80,14 @@ export async function uploadChunk(sessionId, fileBlob) {
   return res.data;
 }
 
+// Returns immediately; a queued job comes back with job_id + eta_seconds
 export async function mergeChunks(sessionId) {
-  const res = await axios.post(`/api/sessions/${sessionId}/merge-chunks`);
+  const res = await axios.post(`/api/sessions/${sessionId}/merge-chunks?async=1`);
+  return res.data;
+}
+
+export async function getTranscriptionStatus(sessionId) {
+  const res = await axios.get(`/api/sessions/${sessionId}/transcription-status`);
   return res.data;
 }
 
@@ -86,3 +108,34 @@ export function toggleFavorite(templateId, isFavorite) {
   });
 }
 
+
+// ── Live transcription (Socket.IO) ────────────────────────────────
+let liveSocket = null;
+
+export function getLiveSocket() {
+  if (!liveSocket) {
+    liveSocket = io({ path: '/socket.io', transports: ['websocket'] });
+  }
+  return liveSocket;
+}
+
+// Send one recorded MP3 frame; resolves once the server has stored it.
+export async function sendAudioFrame(sessionId, fileBlob, durationSec, chunkId) {
+  const socket = getLiveSocket();
+  if (!socket.connected) throw new Error('Live socket not connected');
+
+  const audio = await fileBlob.arrayBuffer();
+  return new Promise((resolve, reject) => {
+    socket
+      .timeout(15000)
+      .emit(
+        'audio_frame',
+        { session_id: sessionId, chunk_id: chunkId, audio, duration: durationSec },
+        (err, res) => {
+          if (err) return reject(err);
+          if (res?.error) return reject(new Error(res.error));
+          resolve(res);
+        }
+      );
+  });
+}
@@ -16,7 +16,28 @@ import { Menu, MenuItem, Button, CircularProgress } from '@mui/material';
 
 /* ─── Styles & API ──────────────────────────────────────────── */
 import '../styles/AudioRecorder.css';
-import { uploadChunk, mergeChunks, deleteAudio } from '../api';
+import {
+  uploadChunk,
+  mergeChunks,
+  getTranscriptionStatus,
+  deleteAudio,
+  getLiveSocket,
+  sendAudioFrame,
+} from '../api';
+
+/* Recorder is rotated every FRAME_MS while recording so the server can
+   transcribe the consult as it happens. */
+const FRAME_MS = 5000;
+const STATUS_POLL_MS = 2000;
+const STATUS_TIMEOUT_MS = 30 * 60 * 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/* Id sent with every frame so the server stores it once, even if the live
+   ack is late and the frame is uploaded again over HTTP. */
+const newChunkId = () =>
+  window.crypto?.randomUUID?.() ??
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
 
 function AudioRecorder({
   sessionData,
@@ -45,6 +66,13 @@ function AudioRecorder({
   const [selectedDeviceId, setSelectedDeviceId] = useState('');
   const [micMenuAnchor, setMicMenuAnchor] = useState(null);
 
+  /* live transcript: finalised segments + current partial window */
+  const [liveSegments, setLiveSegments] = useState([]);
+  const [livePartial, setLivePartial] = useState('');
+  const frameStartRef = useRef(0);
+  const rotatingRef = useRef(null);
+  const liveBoxRef = useRef(null);
+
   /* ───────────────────────────────────────────────────────────── */
   /*  Notify parent when recording starts / stops                 */
   /* ───────────────────────────────────────────────────────────── */
@@ -90,6 +118,47 @@ function AudioRecorder({
       .catch((err) => console.error('Enumerate devices error:', err));
   }, []);
 
+  /* ───────────────────────────────────────────────────────────── */
+  /*  Live transcript subscription                                */
+  /* ───────────────────────────────────────────────────────────── */
+  useEffect(() => {
+    const sessionId = sessionData?.session_id;
+    if (!sessionId) return;
+
+    const socket = getLiveSocket();
+    const join = () => socket.emit('join_live', { session_id: sessionId });
+    const onSegment = (seg) => {
+      if (seg.session_id !== sessionId) return;
+      if (seg.final) {
+        setLiveSegments((prev) => {
+          const next = [...prev];
+          next[seg.index] = seg.text;
+          return next;
+        });
+        setLivePartial('');
+      } else {
+        setLivePartial(seg.text);
+      }
+    };
+
+    setLiveSegments([]);
+    setLivePartial('');
+    if (socket.connected) join();
+    socket.on('connect', join);
+    socket.on('transcript_segment', onSegment);
+    return () => {
+      socket.off('connect', join);
+      socket.off('transcript_segment', onSegment);
+    };
+  }, [sessionData?.session_id]);
+
+  /* keep the newest text in view */
+  useEffect(() => {
+    if (liveBoxRef.current) {
+      liveBoxRef.current.scrollTop = liveBoxRef.current.scrollHeight;
+    }
+  }, [liveSegments, livePartial]);
+
   /* ───────────────────────────────────────────────────────────── */
   /*  Reset status on session change                              */
   /* ───────────────────────────────────────────────────────────── */
@@ -133,6 +202,64 @@ function AudioRecorder({
     };
   }, [status, accumulatedTime]);
 
+  /* ───────────────────────────────────────────────────────────── */
+  /*  Frame rotation (live transcription)                          */
+  /* ───────────────────────────────────────────────────────────── */
+  useEffect(() => {
+    if (status !== 'recording') return undefined;
+    const intervalId = setInterval(() => {
+      if (!rotatingRef.current) {
+        rotatingRef.current = rotateRecorder().finally(() => {
+          rotatingRef.current = null;
+        });
+      }
+    }, FRAME_MS);
+    return () => clearInterval(intervalId);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [status]);
+
+  /* Send a frame live; fall back to the plain chunk upload if the socket
+     is unavailable (the server then transcribes the merged file). */
+  const sendFrame = async (blob, startedAt) => {
+    const seconds = (Date.now() - startedAt) / 1000;
+    const chunkId = newChunkId();
+    try {
+      await sendAudioFrame(sessionData.session_id, blob, seconds, chunkId);
+    } catch (err) {
+      console.warn('Live frame failed, uploading chunk instead:', err);
+      await uploadChunk(sessionData.session_id, blob, chunkId);
+    }
+  };
+
+  /* Start the next recorder before stopping the current one, so no audio
+     is lost between frames. */
+  const rotateRecorder = async () => {
+    const current = recorderRef.current;
+    if (!current) return;
+    try {
+      const next = new MicRecorder({ bitRate: 64 });
+      await next.start();
+      recorderRef.current = next;
+
+      const startedAt = frameStartRef.current;
+      frameStartRef.current = Date.now();
+      const [, blob] = await current.stop().getMp3();
+      await sendFrame(blob, startedAt);
+    } catch (err) {
+      console.error('rotateRecorder:', err);
+    }
+  };
+
+  /* Stop the active recorder (after any in-flight rotation) and send it. */
+  const flushRecorder = async () => {
+    if (rotatingRef.current) await rotatingRef.current;
+    const current = recorderRef.current;
+    if (!current) return;
+    recorderRef.current = null;
+    const [, blob] = await current.stop().getMp3();
+    await sendFrame(blob, frameStartRef.current);
+  };
+
   const updateTimerDisplay = (msVal) => {
     const secs = Math.floor(msVal / 1000);
     const mm = String(Math.floor(secs / 60)).padStart(2, '0');
@@ -170,6 +297,7 @@ function AudioRecorder({
       const rec = new MicRecorder({ bitRate: 64 });
       recorderRef.current = rec;
       await rec.start();
+      frameStartRef.current = Date.now();
     } catch (err) {
       console.error('startRecording:', err);
       setStatus('idle');
@@ -185,11 +313,8 @@ function AudioRecorder({
       setAccumulatedTime(totalMs);
       updateTimerDisplay(totalMs);
 
-      const [, blob] = await recorderRef.current.stop().getMp3();
-      recorderRef.current = null;
-
       onStatusUpdate?.('Uploading partial…');
-      await uploadChunk(sessionData.session_id, blob);
+      await flushRecorder();
 
       setStatus('paused');
       onStatusUpdate?.('Paused.');
@@ -207,6 +332,7 @@ function AudioRecorder({
       const rec = new MicRecorder({ bitRate: 64 });
       recorderRef.current = rec;
       await rec.start();
+      frameStartRef.current = Date.now();
     } catch (err) {
       console.error('resumeRecording:', err);
     }
@@ -223,9 +349,7 @@ function AudioRecorder({
         setAccumulatedTime(totalMs);
         updateTimerDisplay(totalMs);
 
-        const [, blob] = await recorderRef.current.stop().getMp3();
-        recorderRef.current = null;
-        await uploadChunk(sessionData.session_id, blob);
+        await flushRecorder();
       }
 
       /* stop waveform */
@@ -237,7 +361,19 @@ function AudioRecorder({
       if (audioCtxRef.current) audioCtxRef.current.close();
 
       onStatusUpdate?.('Merging chunks…');
-      await mergeChunks(sessionData.session_id);
+      let job = await mergeChunks(sessionData.session_id);
+
+      /* queued on the server: poll until done, showing the ETA */
+      const deadline = Date.now() + STATUS_TIMEOUT_MS;
+      while (job?.status && job.status !== 'done') {
+        if (job.status === 'error') throw new Error(job.error);
+        if (Date.now() > deadline) throw new Error('Transcription timed out');
+        if (job.eta_seconds) {
+          onStatusUpdate?.(`Transcribing… ~${Math.ceil(job.eta_seconds)}s`);
+        }
+        await sleep(STATUS_POLL_MS);
+        job = await getTranscriptionStatus(sessionData.session_id);
+      }
 
       await fetchSessionDetails?.(sessionData.session_id);
       setStatus('done');
@@ -346,7 +482,19 @@ function AudioRecorder({
   const mainButtonSpansRows =
     status === 'idle' || status === 'transcribing';
 
+  const liveText = [...liveSegments, livePartial].filter(Boolean).join(' ');
+  const showLive =
+    liveText &&
+    (status === 'recording' || status === 'paused' || status === 'transcribing');
+
   return (
+    <>
+    {showLive && (
+      <div className="live-transcript" ref={liveBoxRef}>
+        {liveSegments.filter(Boolean).join(' ')}{' '}
+        {livePartial && <span className="live-partial">{livePartial}</span>}
+      </div>
+    )}
     <div className="audio-recorder-card">
       {/* ROW 1: main button */}
       <div
@@ -458,6 +606,7 @@ function AudioRecorder({
         ))}
       </Menu>
     </div>
+    </>
   );
 }
 
@@ -12,45 +12,25 @@ import Interpretations from './Interpretations';
 import '../styles/SessionDetail.css';
 
 
-function SessionDetail({ sessionData, fetchSessionDetails, onCreateSession }) {
+function SessionDetail({ sessionData, fetchSessionDetails, onTemplatesChanged, onCreateSession }) {
   /* ------------------------------------------------------------ */
   /*  Local state                                                 */
   /* ------------------------------------------------------------ */
-  const [interpretations, setInterpretations] = useState([]);
-  const [templates,       setTemplates]       = useState([]);
   const [activeTab,       setActiveTab]       = useState('summary');
   const [isWriting, setIsWriting] = useState(false);
 
-  /* ------------------------------------------------------------ */
-  /*  Helpers                                                     */
-  /* ------------------------------------------------------------ */
-  const refreshInterpretations = async (sid) => {
-    if (!sid) { setInterpretations([]); return; }
-    try {
-      const res = await axios.get(`/api/interpretations?session_id=${sid}`);
-      setInterpretations(res.data);
-    } catch (err) { console.error(err); setInterpretations([]); }
-  };
-
-  const refreshTemplates = async () => {
-    try {
-      const res = await axios.get('/api/templates');
-      setTemplates(res.data);
-    } catch (err) { console.error('Error fetching templates:', err); }
-  };
+  /* notes & template index arrive with the session (overview endpoint) */
+  const interpretations = sessionData?.interpretations || [];
+  const templates       = sessionData?.templateIndex   || [];
 
   /* ------------------------------------------------------------ */
   /*  Effects                                                     */
   /* ------------------------------------------------------------ */
-  /* reset tab & reload notes whenever session changes */
+  /* reset tab whenever session changes */
   useEffect(() => {
     setActiveTab('summary');
-    refreshInterpretations(sessionData?.session_id);
   }, [sessionData?.session_id]);
 
-  /* get template list once on mount                               */
-  useEffect(() => { refreshTemplates(); }, []);
-
   /* ------------------------------------------------------------ */
   /*  After WRITE-NOTE callback                                   */
   /* ------------------------------------------------------------ */
@@ -62,9 +42,7 @@ function SessionDetail({ sessionData, fetchSessionDetails, onCreateSession }) {
         session_id: sessionData.session_id,
         template_id: templateId,
       });
-      await refreshInterpretations(sessionData.session_id);
-      await refreshTemplates();
-      fetchSessionDetails?.(sessionData.session_id);
+      await fetchSessionDetails?.(sessionData.session_id);
     } catch (err) {
       console.error(err);
     } finally {
@@ -115,6 +93,10 @@ function SessionDetail({ sessionData, fetchSessionDetails, onCreateSession }) {
         <div className="tpl-cont">
           <TemplateBar
             sessionData={sessionData}
+            templates={sessionData?.templateIndex}
+            onTemplatesChanged={() =>
+              sessionData && onTemplatesChanged?.(sessionData.session_id)
+            }
             transcriptReady={Boolean(sessionData?.transcription_text)}
             interpretationsCount={interpretations.length}
             writing={isWriting} 
@@ -154,7 +136,7 @@ function SessionDetail({ sessionData, fetchSessionDetails, onCreateSession }) {
             <div className="interp_container">
               <Interpretations
                 interpretations={interpretations}
-                templates={templates}
+                templates={sessionData?.templateIndex}
                 isWriting={isWriting}
               />
             </div>
@@ -11,13 +11,16 @@ import StarIcon               from '@mui/icons-material/Star';
 import EditOutlinedIcon       from '@mui/icons-material/EditOutlined';
 import DeleteOutlineIcon      from '@mui/icons-material/DeleteOutline';
 
-import axios from 'axios';
-import { toggleFavorite, deleteTemplate } from '../api';
+import { toggleFavorite, deleteTemplate, getTemplate } from '../api';
 import TemplateModal from './TemplateModal';
 import '../styles/Template.css';
 
+const NO_TEMPLATES = [];   // stable default, so the sync effect runs once
+
 function TemplateBar({
   sessionData,
+  templates: templateIndex = NO_TEMPLATES, // overview's template index (no text)
+  onTemplatesChanged,           // refresh that index after an edit
   transcriptReady = false,      // Boolean: transcript exists right now
   interpretationsCount = 0,     // # of notes currently in DB
   writing = false,              // true while note is being generated
@@ -49,24 +52,9 @@ function TemplateBar({
     });
   };
 
-  /** Fetch list & pre-select most-used template */
+  /** Reload the index via the parent's overview (no extra GET /templates) */
   const fetchTemplates = async () => {
-    try {
-      const res    = await axios.get('/api/templates');
-      const sorted = sortTemplates(res.data);
-      setTemplates(sorted);
-
-      /* pick most-used only once, if nothing is chosen yet */
-      if (!selectedTemplateId && sorted.length) {
-        const mostUsed = sorted.reduce(
-          (max, t) => (t.times_used > (max?.times_used ?? -1) ? t : max),
-          null
-        );
-        setSelectedTemplateId(mostUsed?.template_id || '');
-      }
-    } catch (err) {
-      console.error('Error fetching templates:', err);
-    }
+    await onTemplatesChanged?.();
   };
 
   /* ---------------------------------------------------------------- */
@@ -107,12 +95,18 @@ function TemplateBar({
     }
   };
 
-  const handleEditClick = (tmpl, e) => {
+  const handleEditClick = async (tmpl, e) => {
     e.stopPropagation();
     e.preventDefault();
     setMenuOpen(false);
-    setEditingTemplate(tmpl);
-    setShowModal(true);
+    try {
+      /* the index has no template_text; load it only for editing */
+      const res = await getTemplate(tmpl.template_id);
+      setEditingTemplate(res.data);
+      setShowModal(true);
+    } catch (err) {
+      console.error('Error loading template:', err);
+    }
   };
 
   const handleDeleteClick = async (tmpl, e) => {
@@ -132,8 +126,20 @@ function TemplateBar({
   /* ---------------------------------------------------------------- */
   /*  Effects                                                         */
   /* ---------------------------------------------------------------- */
-  /* 1️⃣  initial fetch */
-  useEffect(() => { fetchTemplates(); }, []);        // eslint-disable-line
+  /* 1️⃣  mirror the index & pre-select most-used template */
+  useEffect(() => {
+    const sorted = sortTemplates(templateIndex);
+    setTemplates(sorted);
+
+    /* pick most-used only once, if nothing is chosen yet */
+    if (!selectedTemplateId && sorted.length) {
+      const mostUsed = sorted.reduce(
+        (max, t) => (t.times_used > (max?.times_used ?? -1) ? t : max),
+        null
+      );
+      setSelectedTemplateId(mostUsed?.template_id || '');
+    }
+  }, [templateIndex]);                               // eslint-disable-line
 
   /* 2️⃣  on session change: reset flags & remember starting state */
   useEffect(() => {